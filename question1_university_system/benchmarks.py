@@ -0,0 +1,279 @@
+"""Synthetic-scale benchmarks for the university system.
+
+Run from the repository root, e.g.:
+    python -m question1_university_system.benchmarks register --requests 100000
+    python -m question1_university_system.benchmarks memory --students 500000
+    python -m question1_university_system.benchmarks enroll --threads 16 --courses 1 4 16 64
+    python -m question1_university_system.benchmarks storage --students 100000
+"""
+from __future__ import annotations
+import argparse
+import gc
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Tuple
+
+from question1_university_system.student import ManagedUndergrad, ManagedGrad, GradeStore
+from question1_university_system.department import Department, Course, STATUS_DROPPED
+from question1_university_system.enrollment import EnrollmentService
+from question1_university_system.storage import UniversityStore, save_snapshot, load_snapshot
+
+GRADES = ["A", "A-", "B+", "B", "B-", "C+", "C", "D", "F"]
+
+
+def build_department(students: int, courses: int, seed: int = 0) -> Department:
+    """A department with a layered prerequisite DAG and students holding graded history.
+
+    Courses are split into four levels; each course above level one requires
+    one or two courses from the level below. Every student has a few graded
+    courses, always with their prerequisites, so transitive checks matter.
+    """
+    rng = random.Random(seed)
+    dept = Department(name="Synthetic")
+    per_level = max(1, courses // 4)
+    levels: List[List[str]] = []
+    for level in range(4):
+        codes = [f"C{level + 1}{i:03d}" for i in range(per_level)]
+        for code in codes:
+            prereqs = rng.sample(levels[-1], k=min(len(levels[-1]), rng.randint(1, 2))) if levels else []
+            dept.add_course(Course(code=code, title=code, capacity=rng.randint(30, 120), prerequisites=prereqs))
+        levels.append(codes)
+    graph = dept.prerequisite_graph()
+    for i in range(students):
+        cls = ManagedGrad if i % 5 == 0 else ManagedUndergrad
+        s = cls(f"S{i:06d}", f"student {i}", f"s{i}@uni.edu")
+        # Complete one random course and its whole prerequisite chain
+        done = rng.choice(levels[rng.randint(0, 2)])
+        for code in sorted(graph.requires(done) | {done}):
+            if s.record.enrollment_count() < s.record.max_enrollments:
+                s.record.enroll(code)
+                s.record.set_grade(code, rng.choice(GRADES))
+        dept.add_student(s)
+    return dept
+
+
+def make_requests(dept: Department, n: int, seed: int = 0) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    students, courses = list(dept.students), list(dept.courses)
+    return [(rng.choice(students), rng.choice(courses)) for _ in range(n)]
+
+
+def bench_register(args: argparse.Namespace) -> None:
+    results = {}
+    for mode in ("loop", "batch"):
+        dept = build_department(args.students, args.courses, args.seed)
+        requests = make_requests(dept, args.requests, args.seed)
+        gc.collect()  # otherwise the first full collection of the fresh department lands in the timing
+        start = time.perf_counter()
+        if mode == "batch":
+            statuses = Counter(o.status for o in dept.register_batch(requests))
+        else:
+            # One call per request, as before the batch API
+            statuses = Counter()
+            for student_id, course_code in requests:
+                try:
+                    dept.register_student_for_course(student_id, course_code)
+                    statuses["registered"] += 1
+                except (ValueError, TypeError):
+                    statuses["rejected"] += 1
+        seconds = time.perf_counter() - start
+        results[mode] = seconds
+        print(f"{mode:<6} {len(requests):>8,} requests  {seconds:7.3f} s  {len(requests) / seconds:>10,.0f} req/s  "
+              + ", ".join(f"{k}={v:,}" for k, v in sorted(statuses.items())))
+    print(f"batch speedup: {results['loop'] / results['batch']:.2f}x")
+
+
+class _DictUndergrad(ManagedUndergrad):
+    """The pre-slots layout: no __slots__ here, so instances get a __dict__ again."""
+
+
+def build_students(n: int, compact: bool, seed: int = 0) -> list:
+    """n students with 4 graded courses + 2 in progress, as dict records or GradeStore rows."""
+    rng = random.Random(seed)
+    store = GradeStore(capacity=n) if compact else None
+    students = []
+    for i in range(n):
+        if compact:
+            s = ManagedUndergrad(f"S{i:07d}", f"student {i}", f"s{i}@uni.edu", record=store.new_record())
+        else:
+            s = _DictUndergrad(f"S{i:07d}", f"student {i}", f"s{i}@uni.edu")
+        for k in range(6):
+            # Codes arrive as fresh strings, as when read from a file; the GradeStore keeps one copy each
+            code = "".join(["CS", str(100 + rng.randrange(200))]) if k else "".join(["MA", str(100 + i % 50)])
+            if not s.record.has_course(code):
+                s.record.enroll(code)
+                if k < 4:
+                    s.record.set_grade(code, rng.choice(GRADES))
+        students.append(s)
+    return students
+
+
+def bench_memory(args: argparse.Namespace) -> None:
+    results = {}
+    for mode in ("dict", "compact"):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        students = build_students(args.students, mode == "compact", args.seed)
+        seconds = time.perf_counter() - start
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[mode] = current
+        print(f"{mode:<8} {len(students):>9,} students  {current / 2**20:8.1f} MB  "
+              f"{current / len(students):6.0f} B/student  built in {seconds:.2f} s")
+        del students
+    print(f"compact uses {results['compact'] / results['dict']:.0%} of the dict representation")
+
+
+def stress_enrollment(courses: int, threads: int, ops: int, capacity: int, io_ms: float, seed: int = 0,
+                      fail_rate: float = 0.0) -> dict:
+    """Hammer one EnrollmentService from many threads, then check every invariant.
+
+    `io_ms` sleeps in on_commit, inside the locks, standing in for a database
+    write; that is where per-course locking pays off. A `fail_rate` fraction
+    of those writes raise instead, and the service must roll each one back:
+    at the end, the enrollments on record must be exactly those committed.
+    """
+    dept = Department(name="Stress")
+    for c in range(courses):
+        dept.add_course(Course(code=f"K{c:03d}", title=f"K{c:03d}", capacity=capacity))
+    for i in range(threads * 20):
+        dept.add_student(ManagedUndergrad(f"S{i:05d}", f"student {i}", f"s{i}@uni.edu"))
+    committed, log_lock = set(), threading.Lock()
+
+    def on_commit(outcome) -> None:
+        if io_ms:
+            time.sleep(io_ms / 1000)
+        if fail_rate and random.random() < fail_rate:
+            raise RuntimeError("simulated write failure")
+        with log_lock:
+            key = (outcome.student_id, outcome.course_code)
+            committed.discard(key) if outcome.status == STATUS_DROPPED else committed.add(key)
+
+    service = EnrollmentService(dept, on_commit=on_commit)
+    student_ids, codes = list(dept.students), list(dept.courses)
+
+    def worker(k: int) -> None:
+        rng = random.Random(seed * 1000 + k)
+        for _ in range(ops):
+            student_id, code = rng.choice(student_ids), rng.choice(codes)
+            try:
+                if rng.random() < 0.3:
+                    service.drop(student_id, code)
+                else:
+                    service.register(student_id, code)
+            except (ValueError, RuntimeError):
+                pass
+
+    pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    seconds = time.perf_counter() - start
+    # A failed promotion leaves its seat free until promote is retried
+    fail_rate = 0.0
+    for code in dept.courses:
+        service.promote(code)
+
+    for code, course in dept.courses.items():
+        assert len(course.enrolled_students) <= course.capacity, f"{code} overbooked"
+        waiting = service.waitlist(code)
+        assert len(waiting) == len(set(waiting)), f"{code} waitlist has duplicates"
+        assert not set(waiting) & course.enrolled_students, f"{code} has enrolled students on its waitlist"
+        assert not waiting or not course.has_seat(), f"{code} has a free seat and a waitlist"
+    for student_id, s in dept.students.items():
+        for code in s.record.courses():
+            assert student_id in dept.courses[code].enrolled_students, f"{student_id} record/course out of sync"
+    assert sum(len(c.enrolled_students) for c in dept.courses.values()) == \
+        sum(s.record.enrollment_count() for s in dept.students.values()), "seat/record totals differ"
+    enrolled = {(student_id, code) for student_id, s in dept.students.items() for code in s.record.courses()}
+    assert enrolled == committed, f"{len(enrolled ^ committed)} enrollments differ from the committed ones"
+    return {"seconds": seconds, "ops_per_sec": threads * ops / seconds}
+
+
+def bench_enroll(args: argparse.Namespace) -> None:
+    for courses in args.courses:
+        r = stress_enrollment(courses, args.threads, args.ops, args.capacity, args.io_ms, args.seed, args.fail_rate)
+        print(f"{courses:>4} courses  {args.threads} threads x {args.ops:,} ops  {r['seconds']:7.3f} s  "
+              f"{r['ops_per_sec']:>10,.0f} ops/s  invariants ok")
+
+
+def bench_storage(args: argparse.Namespace) -> None:
+    def measure(label: str, func):
+        # tracemalloc slows allocation-heavy code a lot, so memory is opt-in
+        gc.collect()
+        if args.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        held = ""
+        if args.memory:
+            held = f"  {tracemalloc.get_traced_memory()[0] / 2**20:8.1f} MB held"
+            tracemalloc.stop()
+        print(f"{label:<34} {seconds:8.3f} s{held}")
+        return result
+
+    dept = build_department(args.students, args.courses, args.seed)
+    dept.register_batch(make_requests(dept, args.students, args.seed))
+    with tempfile.TemporaryDirectory() as tmp:
+        db, snapshot = os.path.join(tmp, "university.db"), os.path.join(tmp, "university.pkl")
+        with UniversityStore(db) as store:
+            measure("save to SQLite", lambda: store.save_department(dept))
+            save_snapshot(dept, snapshot)
+            store.checkpoint()  # otherwise recent pages sit in university.db-wal, not in the file measured
+            print(f"{'sizes':<34} SQLite {os.path.getsize(db) / 2**20:.1f} MB, "
+                  f"snapshot {os.path.getsize(snapshot) / 2**20:.1f} MB")
+            del dept
+            measure("rebuild in memory (baseline)",
+                     lambda: build_department(args.students, args.courses, args.seed)).students.clear()
+            lazy = measure("load lazy (courses + rosters)", lambda: store.load_department("Synthetic"))
+            ids = random.Random(args.seed).sample(list(lazy.students), min(args.lookups, len(lazy.students)))
+            measure(f"  then {len(ids):,} student lookups", lambda: [lazy.students[i] for i in ids])
+            del lazy
+            measure("load eager (every student)", lambda: store.load_department("Synthetic", lazy=False))
+        measure("load pickle snapshot", lambda: load_snapshot(snapshot))
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+    reg = sub.add_parser("register", help="Batch vs one-at-a-time registration throughput")
+    reg.add_argument("--requests", type=int, default=100_000)
+    reg.add_argument("--students", type=int, default=20_000)
+    reg.add_argument("--courses", type=int, default=200)
+    reg.add_argument("--seed", type=int, default=0)
+    reg.set_defaults(func=bench_register)
+    mem = sub.add_parser("memory", help="Memory of dict-based vs slotted, GradeStore-backed students")
+    mem.add_argument("--students", type=int, default=100_000)
+    mem.add_argument("--seed", type=int, default=0)
+    mem.set_defaults(func=bench_memory)
+    enr = sub.add_parser("enroll", help="Threaded stress test of EnrollmentService (capacity, sync, waitlists)")
+    enr.add_argument("--threads", type=int, default=16)
+    enr.add_argument("--courses", type=int, nargs="+", default=[1, 4, 16, 64])
+    enr.add_argument("--ops", type=int, default=2_000, help="Requests per thread")
+    enr.add_argument("--capacity", type=int, default=50)
+    enr.add_argument("--io-ms", type=float, default=1.0, help="Simulated write time held under the course lock")
+    enr.add_argument("--fail-rate", type=float, default=0.02, help="Fraction of commits that raise and must roll back")
+    enr.add_argument("--seed", type=int, default=0)
+    enr.set_defaults(func=bench_enroll)
+    sto = sub.add_parser("storage", help="SQLite save/load (lazy and eager) and snapshot cold start")
+    sto.add_argument("--students", type=int, default=100_000)
+    sto.add_argument("--courses", type=int, default=200)
+    sto.add_argument("--lookups", type=int, default=1_000)
+    sto.add_argument("--memory", action="store_true", help="Also report memory held (tracemalloc; slows timings)")
+    sto.add_argument("--seed", type=int, default=0)
+    sto.set_defaults(func=bench_storage)
+    args = ap.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""GPA parity check: running-total GPAs must equal the original float calculate_gpa.
+
+Every grade sequence up to --exhaustive courses, plus random full records
+with in-progress courses, regrades and drops, is replayed into a dict record
+and a GradeStore row. Each record's gpa(), and Department.cohort_gpa() over
+all of them, is compared with the original
+`round(sum(weights) / len(weights), 2)`. Exact .xx5 ties are counted
+separately, since that is where the float sum's rounding error decides.
+
+    python -m question1_university_system.check_gpa
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import random
+from typing import Dict, List, Sequence, Tuple
+
+from question1_university_system.student import (ManagedUndergrad, GradeStore, SecureStudentRecord, GRADE_POINTS,
+                                                  DEANS_LIST_GPA, PROBATION_GPA, is_gpa_tie)
+from question1_university_system.department import Department
+
+LETTERS = [g for g in GRADE_POINTS if g != "IP"]
+
+
+def old_calculate_gpa(courses: Dict[str, str]) -> float:
+    """StudentManagerMixin.calculate_gpa before running totals, verbatim."""
+    weights = {"A":4.0,"A-":3.7,"B+":3.3,"B":3.0,"B-":2.7,"C+":2.3,"C":2.0,"D":1.0,"F":0.0}
+    grades = [weights[g] for g in courses.values() if g != "IP"]
+    return round(sum(grades)/len(grades), 2) if grades else 0.0
+
+
+def old_academic_status(gpa: float) -> str:
+    if gpa >= 3.7: return "Dean's List"
+    if gpa < 2.0:  return "Probation"
+    return "Good Standing"
+
+
+def exhaustive(max_courses: int) -> List[List[Tuple[str, str]]]:
+    """(course, letter) histories grading every sequence of up to `max_courses` letters."""
+    return [[(f"C{i}", g) for i, g in enumerate(seq)]
+            for k in range(1, max_courses + 1) for seq in itertools.product(LETTERS, repeat=k)]
+
+
+def randomized(n: int, max_courses: int, seed: int) -> List[List[Tuple[str, str]]]:
+    """Histories that also leave courses in progress, regrade, and drop ("-")."""
+    rng = random.Random(seed)
+    histories = []
+    for _ in range(n):
+        codes = [f"C{i}" for i in range(max_courses)]
+        history = [(code, rng.choice(LETTERS + ["IP"])) for code in codes]
+        for _ in range(rng.randint(0, 3)):
+            history.append((rng.choice(codes), rng.choice(LETTERS + ["-"])))
+        histories.append(history)
+    return histories
+
+
+def replay(record, history: Sequence[Tuple[str, str]]) -> None:
+    for code, letter in history:
+        if letter == "-":
+            if record.has_course(code):
+                record.drop(code)
+        else:
+            if not record.has_course(code):
+                record.enroll(code)
+            if letter != "IP":
+                record.set_grade(code, letter)
+
+
+def check(histories: List[List[Tuple[str, str]]], label: str) -> None:
+    store = GradeStore(capacity=len(histories))
+    dept, expected, ties = Department(name="Check"), {}, 0
+    for i, history in enumerate(histories):
+        for kind, record in (("dict", SecureStudentRecord()), ("compact", store.new_record())):
+            replay(record, history)
+            want = old_calculate_gpa(record.courses())
+            got = record.gpa()
+            assert got == want, f"{kind} record {history}: gpa {got}, calculate_gpa {want}"
+            student = ManagedUndergrad(f"{kind}{i}", f"student {i}", f"{kind}{i}@uni.edu", record)
+            dept.add_student(student)
+            expected[student.id] = want
+            ties += is_gpa_tie(*record.grade_totals())
+    for student_id, gpa, status in dept.cohort_gpa().rows():
+        want = expected[student_id]
+        assert gpa == want and status == old_academic_status(want), \
+            f"cohort_gpa {student_id}: {gpa} {status}, calculate_gpa {want} {old_academic_status(want)}"
+    print(f"ok  {label:<12} {len(histories):>9,} histories x 2 records  ({ties:,} ties)")
+
+
+if __name__ == "__main__":
+    assert (DEANS_LIST_GPA, PROBATION_GPA) == (3.7, 2.0)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--exhaustive", type=int, default=4, help="Grade every sequence of up to this many courses")
+    ap.add_argument("--random", type=int, default=50_000, help="Random 6-course histories with IP, regrades, drops")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    check(exhaustive(args.exhaustive), "exhaustive")
+    check(randomized(args.random, 6, args.seed), "randomized")
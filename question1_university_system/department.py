@@ -1,18 +1,30 @@
 from __future__ import annotations
-from typing import Dict, List, Optional, Set
+import sys
+from typing import Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
 from dataclasses import dataclass, field
+import numpy as np
 from .person import Person, Faculty, Professor, Lecturer, TA
-from .student import ManagedUndergrad, ManagedGrad
+from .student import ManagedUndergrad, ManagedGrad, StudentManagerMixin, DEANS_LIST_GPA, PROBATION_GPA
 
 
 @dataclass
 class Course:
+    """A course offering. `prerequisites` is kept as a tuple; assigning it bumps `revision`."""
     code: str
     title: str
     capacity: int = 50
-    prerequisites: List[str] = field(default_factory=list)
+    prerequisites: Tuple[str, ...] = ()
     enrolled_students: Set[str] = field(default_factory=set)
     assigned_faculty_id: Optional[str] = None
+    # Bumped by every prerequisite assignment and CourseTable change, in any
+    # department, so a cached PrerequisiteGraph can tell it is stale in O(1)
+    revision: ClassVar[int] = 0
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "prerequisites":
+            value = tuple(value)
+            Course.revision += 1
+        object.__setattr__(self, name, value)
 
     def has_seat(self) -> bool:
         return len(self.enrolled_students) < self.capacity
@@ -23,18 +35,159 @@ class Course:
     def enroll(self, student_id: str) -> None:
         if not self.has_seat():
             raise ValueError(f"Course {self.code} is full")
-        self.enrolled_students.add(student_id)
+        self.enrolled_students.add(sys.intern(student_id))
 
     def drop(self, student_id: str) -> None:
         self.enrolled_students.discard(student_id)
 
 
+class CourseTable(Dict[str, Course]):
+    """Department.courses: a dict that bumps Course.revision whenever its contents change."""
+    def __setitem__(self, code: str, course: Course) -> None:
+        super().__setitem__(code, course)
+        Course.revision += 1
+
+    def __delitem__(self, code: str) -> None:
+        super().__delitem__(code)
+        Course.revision += 1
+
+    def pop(self, *args: Any) -> Any:
+        Course.revision += 1
+        return super().pop(*args)
+
+    def popitem(self) -> Tuple[str, Course]:
+        Course.revision += 1
+        return super().popitem()
+
+    def setdefault(self, code: str, course: Course) -> Course:
+        Course.revision += 1
+        return super().setdefault(code, course)
+
+    def update(self, *args: Any, **kwargs: Course) -> None:
+        super().update(*args, **kwargs)
+        Course.revision += 1
+
+    def clear(self) -> None:
+        super().clear()
+        Course.revision += 1
+
+    def __ior__(self, other: Any) -> CourseTable:
+        self.update(other)
+        return self
+
+
+class PrerequisiteGraph:
+    """Prerequisite DAG of a set of courses, with transitive prerequisites precomputed.
+
+    Raises ValueError if the prerequisites form a cycle. Prerequisites that are
+    not courses of the department are kept as leaves.
+    """
+    def __init__(self, courses: Dict[str, Course]):
+        self.edges: Dict[str, Tuple[str, ...]] = {c.code: tuple(c.prerequisites) for c in courses.values()}
+        self.order = self._topological_order()
+        self.closure: Dict[str, FrozenSet[str]] = {}
+        for code in self.order:  # prerequisites come first, so their closures are ready
+            required: Set[str] = set()
+            for p in self.edges.get(code, ()):
+                required.add(p)
+                required |= self.closure.get(p, frozenset())
+            self.closure[code] = frozenset(required)
+
+    def _topological_order(self) -> List[str]:
+        # Kahn's algorithm; whatever is left over sits on (or behind) a cycle
+        nodes = set(self.edges) | {p for ps in self.edges.values() for p in ps}
+        waiting = {n: len(set(self.edges.get(n, ()))) for n in nodes}
+        unlocks: Dict[str, List[str]] = {}
+        for code, prereqs in self.edges.items():
+            for p in set(prereqs):
+                unlocks.setdefault(p, []).append(code)
+        ready = sorted(n for n, k in waiting.items() if k == 0)
+        order = []
+        while ready:
+            n = ready.pop()
+            order.append(n)
+            for m in unlocks.get(n, ()):
+                waiting[m] -= 1
+                if waiting[m] == 0:
+                    ready.append(m)
+        if len(order) < len(nodes):
+            raise ValueError(f"Prerequisite cycle among {sorted(n for n in nodes if waiting[n])}")
+        return order
+
+    def requires(self, course_code: str) -> FrozenSet[str]:
+        """All direct and indirect prerequisites of a course."""
+        return self.closure.get(course_code, frozenset())
+
+
+STATUS_REGISTERED = "registered"
+STATUS_UNKNOWN_STUDENT = "unknown_student"
+STATUS_UNKNOWN_COURSE = "unknown_course"
+STATUS_UNSUPPORTED = "unsupported_student"
+STATUS_MISSING_PREREQUISITES = "missing_prerequisites"
+STATUS_ALREADY_ENROLLED = "already_enrolled"
+STATUS_LIMIT_REACHED = "enrollment_limit"
+STATUS_COURSE_FULL = "course_full"
+STATUS_WAITLISTED = "waitlisted"
+STATUS_DROPPED = "dropped"
+
+
+class RegistrationOutcome(NamedTuple):
+    """Result of one (student_id, course_code) registration request.
+
+    A NamedTuple rather than a frozen dataclass, whose __init__ goes through
+    object.__setattr__ per field; batches build one per request.
+    """
+    student_id: str
+    course_code: str
+    status: str  # one of the STATUS_* values above
+    detail: str = ""
+    missing: Tuple[str, ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_REGISTERED
+
+
+def seniority_priority(student: Person, course_code: str) -> Any:
+    """Default batch priority: students with more completed courses go first, then by ID.
+
+    register_batch computes this once per student rather than calling it.
+    """
+    completed = len(student.record.completed()) if isinstance(student, StudentManagerMixin) else 0
+    return (-completed, student.id)
+
+
+@dataclass
+class CohortGPA:
+    """GPA and academic status of many students, as arrays parallel to `student_ids`."""
+    student_ids: List[str]
+    gpa: np.ndarray  # float64, rounded to 2 places
+    status: np.ndarray  # "Dean's List" / "Good Standing" / "Probation"
+
+    def rows(self) -> Iterable[Tuple[str, float, str]]:
+        return zip(self.student_ids, self.gpa.tolist(), self.status.tolist())
+
+    def deans_list(self) -> List[str]:
+        return [self.student_ids[i] for i in np.flatnonzero(self.status == "Dean's List")]
+
+    def probation(self) -> List[str]:
+        return [self.student_ids[i] for i in np.flatnonzero(self.status == "Probation")]
+
+
 @dataclass
 class Department:
     name: str
     faculty: Dict[str, Faculty] = field(default_factory=dict)
     courses: Dict[str, Course] = field(default_factory=dict)
     students: Dict[str, Person] = field(default_factory=dict)
+    _graph: Optional[PrerequisiteGraph] = field(default=None, init=False, repr=False, compare=False)
+    _graph_revision: int = field(default=-1, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "courses" and not isinstance(value, CourseTable):
+            value = CourseTable(value)
+            Course.revision += 1
+        object.__setattr__(self, name, value)
 
     def add_course(self, course: Course) -> None:
         self.courses[course.code] = course
@@ -51,20 +204,167 @@ class Department:
             raise ValueError("Faculty not in department")
         course.assign_faculty(faculty_id)
 
+    def set_prerequisites(self, course_code: str, prerequisites: Iterable[str]) -> None:
+        """Replace a course's prerequisites; raises ValueError, changing nothing, if that makes a cycle."""
+        course = self.courses[course_code]
+        old, course.prerequisites = course.prerequisites, prerequisites
+        try:
+            self.prerequisite_graph()
+        except ValueError:
+            course.prerequisites = old
+            raise
+
+    def prerequisite_graph(self) -> PrerequisiteGraph:
+        """The cycle-checked prerequisite DAG, rebuilt only after courses or prerequisites change.
+
+        Raises ValueError if a direct change to Course.prerequisites made a cycle.
+        """
+        if self._graph is None or self._graph_revision != Course.revision:
+            revision = Course.revision
+            self._graph = PrerequisiteGraph(self.courses)
+            self._graph_revision = revision
+        return self._graph
+
     def register_student_for_course(self, student_id: str, course_code: str) -> None:
         course = self.courses[course_code]
         student = self.students[student_id]
-        # prerequisite checking (naive): student must already have course codes in record with a grade
-        from .student import StudentManagerMixin
+        # Student must have a grade (not "IP") in every direct and indirect prerequisite
         if isinstance(student, StudentManagerMixin):
-            missing = [p for p in course.prerequisites if p not in student.record.courses() or student.record.courses()[p] == "IP"]
+            completed = student.record.completed()
+            missing = sorted(self.prerequisite_graph().requires(course_code) - completed)
             if missing:
                 raise ValueError(f"Missing prerequisites {missing} for {course_code}")
-            course.enroll(student_id)
-            student.enroll_course(course_code)
+            enroll_atomically(course, student)
         else:
             raise TypeError("Student does not support managed enrollment")
 
+    def cohort_gpa(self, student_ids: Optional[Iterable[str]] = None) -> CohortGPA:
+        """GPAs and statuses for all managed students (or `student_ids`) in one NumPy pass.
+
+        Reads each record's running grade totals, so nothing is re-summed per
+        course; results match calculate_gpa / get_academic_status.
+        """
+        students = [self.students[i] for i in student_ids] if student_ids is not None else list(self.students.values())
+        students = [s for s in students if isinstance(s, StudentManagerMixin)]
+        totals = np.array([s.record.grade_totals() for s in students], dtype=np.int64).reshape(-1, 2)
+        points, graded = totals[:, 0], totals[:, 1]
+        # GPA in hundredths, compared as ints so thresholds are exact. Exact .xx5
+        # ties round as the old float sum did, which only the record can say
+        hundredths = np.where(graded > 0, (20 * points + graded) // np.maximum(2 * graded, 1), 0)
+        for i in np.flatnonzero((graded > 0) & ((20 * points) % np.maximum(2 * graded, 1) == graded)):
+            hundredths[i] = round(students[i].record.gpa() * 100)
+        status = np.where(hundredths >= round(DEANS_LIST_GPA * 100), "Dean's List",
+                          np.where(hundredths < round(PROBATION_GPA * 100), "Probation", "Good Standing"))
+        return CohortGPA([s.id for s in students], hundredths / 100, status)
+
+    def register_batch(self, requests: Iterable[Tuple[str, str]],
+                       priority: Callable[[Person, str], Any] = seniority_priority) -> List[RegistrationOutcome]:
+        """Register many (student_id, course_code) requests at once.
+
+        Requests are applied in `priority(student, course_code)` order (ties
+        keep submission order), so who gets the last seats does not depend on
+        how the batch was assembled. Nothing raises per request: each gets a
+        RegistrationOutcome, returned in submission order.
+        """
+        requests = list(requests)
+        closure = self.prerequisite_graph().closure
+        outcomes: List[Optional[RegistrationOutcome]] = [None] * len(requests)
+        # Each student is looked up, and their completed courses collected, once
+        # per batch however many requests they make. Grades don't change during
+        # the batch, so missing prerequisites are settled here, before ordering
+        seen: Dict[str, Person] = {}
+        done_of: Dict[str, Set[str]] = {}
+        queued: List[int] = []
+        courses, no_prereqs = self.courses, frozenset()
+        # Many requests lack the same prerequisites; build each rejection's text once
+        rejections: Dict[Tuple[str, FrozenSet[str]], Tuple[str, Tuple[str, ...]]] = {}
+        for i, (student_id, course_code) in enumerate(requests):
+            done = done_of.get(student_id)
+            if done is None:
+                student = self.students.get(student_id)
+                if student is None:
+                    outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_UNKNOWN_STUDENT)
+                    continue
+                if not isinstance(student, StudentManagerMixin):
+                    outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_UNSUPPORTED,
+                                                      "Student does not support managed enrollment")
+                    continue
+                seen[student_id] = student
+                done = done_of[student_id] = student.record.completed()
+            if course_code not in courses:
+                outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_UNKNOWN_COURSE)
+                continue
+            needed = closure.get(course_code, no_prereqs)
+            if needed and not needed <= done:
+                gap = needed - done
+                found = rejections.get((course_code, gap))
+                if found is None:
+                    missing = tuple(sorted(gap))
+                    found = rejections[course_code, gap] = (
+                        f"Missing prerequisites {list(missing)} for {course_code}", missing)
+                outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_MISSING_PREREQUISITES, *found)
+            else:
+                queued.append(i)
+
+        if priority is seniority_priority:
+            # Rank students once (by ID, then stably by completed count, most first)
+            seniority_of = {student_id: len(done) for student_id, done in done_of.items()}
+            ranked = sorted(seen)
+            ranked.sort(key=seniority_of.__getitem__, reverse=True)
+            rank = dict(zip(ranked, range(len(ranked))))
+            keys = [rank[requests[i][0]] for i in queued]
+        else:
+            keys = [priority(seen[requests[i][0]], requests[i][1]) for i in queued]
+        for j in sorted(range(len(queued)), key=keys.__getitem__):  # stable: ties keep submission order
+            i = queued[j]
+            student_id, course_code = requests[i]
+            student = seen[student_id]
+            record, course = student.record, courses[course_code]
+            if record.has_course(course_code):
+                outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_ALREADY_ENROLLED,
+                                                  f"Already enrolled in {course_code}")
+            elif record.enrollment_count() >= record.max_enrollments:
+                outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_LIMIT_REACHED,
+                                                  "Enrollment limit reached")
+            elif not course.has_seat():
+                outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_COURSE_FULL,
+                                                  f"Course {course_code} is full")
+            else:
+                enroll_atomically(course, student)
+                outcomes[i] = RegistrationOutcome(student_id, course_code, STATUS_REGISTERED)
+        return outcomes
+
+
+def check_registration(student: StudentManagerMixin, course_code: str, graph: PrerequisiteGraph,
+                       completed: Optional[Set[str]] = None) -> Optional[RegistrationOutcome]:
+    """Why `student` may not take `course_code` (prerequisites, duplicates, record limit), or None.
+
+    Seats are not checked here; callers decide between rejecting and waitlisting.
+    """
+    record = student.record
+    missing = graph.requires(course_code) - (record.completed() if completed is None else completed)
+    if missing:
+        missing = tuple(sorted(missing))
+        return RegistrationOutcome(student.id, course_code, STATUS_MISSING_PREREQUISITES,
+                                   f"Missing prerequisites {list(missing)} for {course_code}", missing)
+    if record.has_course(course_code):
+        return RegistrationOutcome(student.id, course_code, STATUS_ALREADY_ENROLLED, f"Already enrolled in {course_code}")
+    if record.enrollment_count() >= record.max_enrollments:
+        return RegistrationOutcome(student.id, course_code, STATUS_LIMIT_REACHED, "Enrollment limit reached")
+    return None
+
+
+def enroll_atomically(course: Course, student: StudentManagerMixin) -> None:
+    """Take a seat in `course` and add it to the student's record, or do neither."""
+    taken = student.id not in course.enrolled_students
+    course.enroll(student.id)
+    try:
+        student.enroll_course(course.code)
+    except Exception:
+        if taken:
+            course.drop(student.id)
+        raise
+
 
 def demo_polymorphism(people: List[Person]) -> List[str]:
     lines = []
@@ -0,0 +1,147 @@
+from __future__ import annotations
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+from .department import (Department, PrerequisiteGraph, RegistrationOutcome, check_registration,
+                         enroll_atomically, STATUS_REGISTERED, STATUS_WAITLISTED, STATUS_DROPPED,
+                         STATUS_UNKNOWN_STUDENT, STATUS_UNKNOWN_COURSE, STATUS_UNSUPPORTED)
+from .student import StudentManagerMixin
+
+
+class EnrollmentService:
+    """Thread-safe registration, drops and FIFO waitlists for one Department.
+
+    Each student and each course has its own lock, and a request always takes
+    the student's lock before the course's, so requests for different courses
+    and students run concurrently without deadlocking. Seat and record are
+    updated together (see enroll_atomically). When a course is full, or
+    already has a waitlist, new requests queue, and `drop` promotes from the
+    head of the queue. Prerequisite checks always use the department's
+    current prerequisite graph.
+
+    `on_commit(outcome)` runs for every enrollment and drop while both locks
+    are still held, e.g. to persist the change. If it raises, the change is
+    undone (a promotion goes back to the head of the waitlist) and the
+    exception propagates; from `drop`, that can be a promotion's failure after
+    the drop itself committed, leaving a free seat until `promote` is retried.
+    """
+    def __init__(self, department: Department, on_commit: Optional[Callable[[RegistrationOutcome], None]] = None):
+        self.department = department
+        self.on_commit = on_commit
+        self.waitlists: Dict[str, Deque[str]] = {}
+        self._guard = threading.Lock()
+        self._student_locks: Dict[str, threading.Lock] = {}
+        self._course_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def graph(self) -> PrerequisiteGraph:
+        return self.department.prerequisite_graph()
+
+    def _lock(self, locks: Dict[str, threading.Lock], key: str) -> threading.Lock:
+        lock = locks.get(key)
+        if lock is None:
+            with self._guard:
+                lock = locks.setdefault(key, threading.Lock())
+        return lock
+
+    def _lookup(self, student_id: str, course_code: str) -> Optional[RegistrationOutcome]:
+        student = self.department.students.get(student_id)
+        if student is None:
+            return RegistrationOutcome(student_id, course_code, STATUS_UNKNOWN_STUDENT)
+        if course_code not in self.department.courses:
+            return RegistrationOutcome(student_id, course_code, STATUS_UNKNOWN_COURSE)
+        if not isinstance(student, StudentManagerMixin):
+            return RegistrationOutcome(student_id, course_code, STATUS_UNSUPPORTED,
+                                       "Student does not support managed enrollment")
+        return None
+
+    def register(self, student_id: str, course_code: str) -> RegistrationOutcome:
+        """Enroll the student, or add them to the course's waitlist if it is full."""
+        rejected = self._lookup(student_id, course_code)
+        if rejected:
+            return rejected
+        student, course = self.department.students[student_id], self.department.courses[course_code]
+        with self._lock(self._student_locks, student_id), self._lock(self._course_locks, course_code):
+            rejected = check_registration(student, course_code, self.graph)
+            if rejected:
+                return rejected
+            waitlist = self.waitlists.get(course_code)
+            # A queue means someone is ahead of this student, even if a seat just opened
+            if waitlist or not course.has_seat():
+                waitlist = self.waitlists.setdefault(course_code, deque())
+                if student_id not in waitlist:
+                    waitlist.append(student_id)
+                return RegistrationOutcome(student_id, course_code, STATUS_WAITLISTED,
+                                           f"Position {waitlist.index(student_id) + 1} on {course_code} waitlist")
+            enroll_atomically(course, student)
+            outcome = RegistrationOutcome(student_id, course_code, STATUS_REGISTERED)
+            self._commit(outcome, lambda: self._unenroll(course, student))
+        return outcome
+
+    def _commit(self, outcome: RegistrationOutcome, undo: Callable[[], None]) -> None:
+        if self.on_commit is None:
+            return
+        try:
+            self.on_commit(outcome)
+        except Exception:
+            undo()  # both locks are still held, so nobody saw the change
+            raise
+
+    @staticmethod
+    def _unenroll(course, student) -> None:
+        student.drop_course(course.code)
+        course.drop(student.id)
+
+    def drop(self, student_id: str, course_code: str) -> List[RegistrationOutcome]:
+        """Drop a course (or leave its waitlist); returns the outcomes of any waitlist promotions."""
+        rejected = self._lookup(student_id, course_code)
+        if rejected:
+            raise ValueError(f"Cannot drop: {rejected.status}")
+        student, course = self.department.students[student_id], self.department.courses[course_code]
+        with self._lock(self._student_locks, student_id), self._lock(self._course_locks, course_code):
+            waitlist = self.waitlists.get(course_code)
+            if waitlist and student_id in waitlist:
+                waitlist.remove(student_id)
+                return []
+            grade = student.record.courses().get(course_code)
+            student.drop_course(course_code)  # raises if not enrolled; nothing changed yet
+            course.drop(student_id)
+            self._commit(RegistrationOutcome(student_id, course_code, STATUS_DROPPED),
+                         lambda: self._reenroll(course, student, grade))
+        return self.promote(course_code)
+
+    @staticmethod
+    def _reenroll(course, student, grade: str) -> None:
+        enroll_atomically(course, student)
+        if grade != "IP":
+            student.record.set_grade(course.code, grade)
+
+    def promote(self, course_code: str) -> List[RegistrationOutcome]:
+        """Fill free seats from the head of the waitlist; `drop` calls this, and
+        callers can retry it after a promotion's on_commit failed."""
+        # The head's student lock must come before the course lock, so peek
+        # under the course lock, then retake both in order and re-check.
+        course, outcomes = self.department.courses[course_code], []
+        course_lock = self._lock(self._course_locks, course_code)
+        while True:
+            with course_lock:
+                waitlist = self.waitlists.get(course_code)
+                if not waitlist or not course.has_seat():
+                    return outcomes
+                head = waitlist[0]
+            student = self.department.students[head]
+            with self._lock(self._student_locks, head), course_lock:
+                if not waitlist or waitlist[0] != head or not course.has_seat():
+                    continue
+                waitlist.popleft()
+                # Grades or other enrollments may have changed while queued
+                outcome = check_registration(student, course_code, self.graph)
+                if outcome is None:
+                    enroll_atomically(course, student)
+                    outcome = RegistrationOutcome(head, course_code, STATUS_REGISTERED, "Promoted from waitlist")
+                    self._commit(outcome, lambda: (self._unenroll(course, student), waitlist.appendleft(head)))
+                outcomes.append(outcome)
+
+    def waitlist(self, course_code: str) -> List[str]:
+        with self._lock(self._course_locks, course_code):
+            return list(self.waitlists.get(course_code, ()))
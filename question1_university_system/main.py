@@ -1,9 +1,11 @@
+import argparse
 from question1_university_system.person import Professor, Lecturer, TA
 from question1_university_system.student import ManagedUndergrad, ManagedGrad
 from question1_university_system.department import Department, Course, demo_polymorphism
+from question1_university_system.storage import UniversityStore
 
 
-def build_demo():
+def build_department() -> Department:
     cs = Department(name="Computer Science")
     # Faculty
     prof = Professor("F001", "Ada Lovelace", "ada@uni.edu", department="CS")
@@ -41,17 +43,37 @@ def build_demo():
     cs.register_student_for_course("S002", "CS201")
     # Next one would raise capacity error if uncommented:
     # cs.register_student_for_course("S003", "CS201")  # capacity=2
+    return cs
+
+
+def build_demo(db_path=None):
+    cs = None
+    if db_path:
+        # Reuse the stored department instead of rebuilding it
+        with UniversityStore(db_path) as store:
+            if "Computer Science" in store.department_names():
+                cs = store.load_department("Computer Science", lazy=False)
+            else:
+                cs = build_department()
+                store.save_department(cs)
+    if cs is None:
+        cs = build_department()
 
     # GPA & statuses
     print("-- GPA & Status --")
-    for s in (s1, s2, s3):
-        print(s.name, s.record.courses(), "GPA:", s.calculate_gpa(), "Status:", s.get_academic_status())
+    cohort = cs.cohort_gpa()
+    for student_id, gpa, status in cohort.rows():
+        s = cs.students[student_id]
+        print(s.name, s.record.courses(), "GPA:", gpa, "Status:", status)
+    print("Dean's List:", cohort.deans_list(), "Probation:", cohort.probation())
 
     # Polymorphism demo
     print("\n-- Polymorphism --")
-    for line in demo_polymorphism([prof, lec, ta, s1, s2, s3]):
+    for line in demo_polymorphism([*cs.faculty.values(), *cs.students.values()]):
         print(line)
 
 
 if __name__ == "__main__":
-    build_demo()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=None, help="SQLite file to load the department from (saved there on first run)")
+    build_demo(ap.parse_args().db)
@@ -1,10 +1,13 @@
 from __future__ import annotations
+import sys
 from abc import ABC, abstractmethod
 from typing import List, Optional
 
 
 class Person(ABC):
     """Base person with validated properties and polymorphic hooks."""
+    # Slots throughout the hierarchy: no per-instance __dict__
+    __slots__ = ("_id", "_name", "_email")
 
     def __init__(self, person_id: str, name: str, email: str):
         self._id = None
@@ -23,7 +26,7 @@ class Person(ABC):
     def id(self, value: str) -> None:
         if not value or not isinstance(value, str):
             raise ValueError("id must be a non-empty string")
-        self._id = value
+        self._id = sys.intern(value)  # one shared copy per ID across people, courses and records
 
     @property
     def name(self) -> str:
@@ -55,11 +58,15 @@ class Person(ABC):
 
 
 class Staff(Person):
+    __slots__ = ()
+
     def get_responsibilities(self) -> List[str]:
         return ["Administrative support", "Operations", "Student services"]
 
 
 class Student(Person):
+    __slots__ = ("level",)
+
     def __init__(self, person_id: str, name: str, email: str, level: str):
         super().__init__(person_id, name, email)
         self.level = level  # Undergraduate or Graduate
@@ -69,6 +76,8 @@ class Student(Person):
 
 
 class Faculty(Person, ABC):
+    __slots__ = ("department",)
+
     def __init__(self, person_id: str, name: str, email: str, department: str):
         super().__init__(person_id, name, email)
         self.department = department
@@ -80,6 +89,8 @@ class Faculty(Person, ABC):
 
 
 class Professor(Faculty):
+    __slots__ = ()
+
     def get_responsibilities(self) -> List[str]:
         return ["Teach courses", "Research & publish", "Supervise students", "Service"]
 
@@ -88,6 +99,8 @@ class Professor(Faculty):
 
 
 class Lecturer(Faculty):
+    __slots__ = ()
+
     def get_responsibilities(self) -> List[str]:
         return ["Teach courses", "Develop curricula", "Advise students"]
 
@@ -96,6 +109,8 @@ class Lecturer(Faculty):
 
 
 class TA(Faculty):
+    __slots__ = ()
+
     def get_responsibilities(self) -> List[str]:
         return ["Assist teaching", "Grade assignments", "Hold office hours"]
 
@@ -104,10 +119,14 @@ class TA(Faculty):
 
 
 class UndergraduateStudent(Student):
+    __slots__ = ()
+
     def __init__(self, person_id: str, name: str, email: str):
         super().__init__(person_id, name, email, level="Undergraduate")
 
 
 class GraduateStudent(Student):
+    __slots__ = ()
+
     def __init__(self, person_id: str, name: str, email: str):
         super().__init__(person_id, name, email, level="Graduate")
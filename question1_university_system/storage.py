@@ -0,0 +1,300 @@
+from __future__ import annotations
+import pickle
+import sqlite3
+import sys
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Set
+from .person import Person, Professor, Lecturer, TA
+from .student import ManagedUndergrad, ManagedGrad, SecureStudentRecord
+from .department import Department, Course
+
+FACULTY_KINDS = {cls.__name__: cls for cls in (Professor, Lecturer, TA)}
+STUDENT_KINDS = {cls.__name__: cls for cls in (ManagedUndergrad, ManagedGrad)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS departments (name TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS faculty (
+    department TEXT NOT NULL, id TEXT NOT NULL, kind TEXT NOT NULL,
+    name TEXT NOT NULL, email TEXT NOT NULL, home TEXT NOT NULL,
+    PRIMARY KEY (department, id));
+CREATE TABLE IF NOT EXISTS courses (
+    department TEXT NOT NULL, code TEXT NOT NULL, title TEXT NOT NULL,
+    capacity INTEGER NOT NULL, faculty_id TEXT,
+    PRIMARY KEY (department, code));
+CREATE TABLE IF NOT EXISTS prerequisites (
+    department TEXT NOT NULL, course_code TEXT NOT NULL, prerequisite TEXT NOT NULL, position INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS students (
+    department TEXT NOT NULL, id TEXT NOT NULL, kind TEXT NOT NULL,
+    name TEXT NOT NULL, email TEXT NOT NULL, max_enrollments INTEGER NOT NULL,
+    PRIMARY KEY (department, id));
+CREATE TABLE IF NOT EXISTS rosters (
+    department TEXT NOT NULL, course_code TEXT NOT NULL, student_id TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS enrollments (
+    department TEXT NOT NULL, student_id TEXT NOT NULL, course_code TEXT NOT NULL,
+    grade TEXT NOT NULL, position INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS gpa_history (
+    department TEXT NOT NULL, student_id TEXT NOT NULL, semester TEXT NOT NULL, gpa REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS enrollments_by_student ON enrollments (department, student_id);
+CREATE INDEX IF NOT EXISTS enrollments_by_course ON enrollments (department, course_code);
+CREATE INDEX IF NOT EXISTS rosters_by_course ON rosters (department, course_code);
+CREATE INDEX IF NOT EXISTS rosters_by_student ON rosters (department, student_id);
+CREATE INDEX IF NOT EXISTS gpa_history_by_student ON gpa_history (department, student_id);
+"""
+
+
+class LazyStudents(MutableMapping):
+    """Department.students backed by the database: a student (with record) is read on first access.
+
+    Students added or loaded here are the ones `save_department` writes back.
+    Safe to share between threads (e.g. an EnrollmentService's): lookups go
+    through the store's lock, so each student is loaded once.
+    """
+    def __init__(self, store: UniversityStore, department: str):
+        self._store, self._department = store, department
+        self.loaded: Dict[str, Person] = {}
+        self._deleted: set = set()
+        self._ids: Optional[List[str]] = None
+
+    def _all_ids(self) -> List[str]:
+        with self._store.lock:
+            if self._ids is None:
+                rows = self._store.conn.execute("SELECT id FROM students WHERE department = ? ORDER BY rowid",
+                                                (self._department,))
+                self._ids = [sys.intern(r[0]) for r in rows]
+            return self._ids
+
+    def __getitem__(self, student_id: str) -> Person:
+        student = self.loaded.get(student_id)
+        if student is None:
+            with self._store.lock:
+                # Another thread may have loaded it meanwhile; never hand out two copies
+                student = self.loaded.get(student_id)
+                if student is None:
+                    if student_id in self._deleted:
+                        raise KeyError(student_id)
+                    student = self._store.load_student(self._department, student_id)
+                    if student is None:
+                        raise KeyError(student_id)
+                    self.loaded[student.id] = student
+        return student
+
+    def __contains__(self, student_id: object) -> bool:
+        if student_id in self.loaded:
+            return True
+        with self._store.lock:
+            if student_id in self._deleted:
+                return False
+            return self._store.conn.execute("SELECT 1 FROM students WHERE department = ? AND id = ?",
+                                            (self._department, student_id)).fetchone() is not None
+
+    def __setitem__(self, student_id: str, student: Person) -> None:
+        with self._store.lock:
+            if student_id not in self:
+                self._all_ids().append(student_id)
+            self._deleted.discard(student_id)
+            self.loaded[student_id] = student
+
+    def __delitem__(self, student_id: str) -> None:
+        with self._store.lock:
+            if student_id not in self:
+                raise KeyError(student_id)
+            self.loaded.pop(student_id, None)
+            self._deleted.add(student_id)
+            self._all_ids().remove(student_id)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._store.lock:
+            return iter(list(self._all_ids()))
+
+    def __len__(self) -> int:
+        return len(self._all_ids())
+
+    def materialize(self) -> Dict[str, Person]:
+        """Every student, in order: the ones in memory as they are, the rest in one bulk read."""
+        with self._store.lock:
+            ids = self._all_ids()
+            pending = set(ids) - self.loaded.keys()
+            stored = {s.id: s for s in self._store._load_students(self._department, pending)}
+            return {sid: self.loaded[sid] if sid in self.loaded else stored[sid] for sid in ids}
+
+    def saved(self) -> None:
+        """Called once the store holds these students: deletions no longer need hiding."""
+        with self._store.lock:
+            self._deleted.clear()
+
+    def reload(self) -> None:
+        """Drop loaded students and pending deletions; read everything from the store again."""
+        with self._store.lock:
+            self.loaded.clear()
+            self._deleted.clear()
+            self._ids = None
+
+
+class UniversityStore:
+    """SQLite persistence for departments, faculty, courses, students, enrollments and grades.
+
+    Course rosters (seats) and student records (enrollments with grades) are
+    separate tables, as they are separate objects in memory. Saves are bulk
+    `executemany` inserts inside one transaction per department. Loads read
+    faculty and courses (with their rosters) up front; students come back
+    through LazyStudents unless `lazy=False`.
+
+    One connection is shared by all threads; `lock` serializes its use (hold
+    it around any direct use of `conn`).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def checkpoint(self) -> None:
+        """Copy the write-ahead log into the database file and empty it."""
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def __enter__(self) -> UniversityStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def department_names(self) -> List[str]:
+        with self.lock:
+            return [r[0] for r in self.conn.execute("SELECT name FROM departments ORDER BY name")]
+
+    def save_department(self, dept: Department) -> None:
+        """Write a department in one transaction, replacing what was stored for it.
+
+        With lazily loaded students, only the students that were loaded or
+        added (and deletions) are rewritten; the rest are left as stored.
+        """
+        name = dept.name
+        lazy = dept.students if isinstance(dept.students, LazyStudents) else None
+        students = lazy.loaded if lazy is not None else dept.students
+        for s in students.values():
+            if type(s).__name__ not in STUDENT_KINDS:
+                raise TypeError(f"Cannot store student of type {type(s).__name__}")
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO departments VALUES (?)", (name,))
+            for table in ("faculty", "courses", "prerequisites", "rosters"):
+                self.conn.execute(f"DELETE FROM {table} WHERE department = ?", (name,))
+            self.conn.executemany("INSERT INTO faculty VALUES (?, ?, ?, ?, ?, ?)",
+                                  [(name, f.id, type(f).__name__, f.name, f.email, f.department)
+                                   for f in dept.faculty.values()])
+            self.conn.executemany("INSERT INTO courses VALUES (?, ?, ?, ?, ?)",
+                                  [(name, c.code, c.title, c.capacity, c.assigned_faculty_id)
+                                   for c in dept.courses.values()])
+            self.conn.executemany("INSERT INTO prerequisites VALUES (?, ?, ?, ?)",
+                                  [(name, c.code, p, i) for c in dept.courses.values()
+                                   for i, p in enumerate(c.prerequisites)])
+            self.conn.executemany("INSERT INTO rosters VALUES (?, ?, ?)",
+                                  ((name, c.code, sid) for c in dept.courses.values() for sid in c.enrolled_students))
+
+            if lazy is None:
+                for table in ("students", "enrollments", "gpa_history"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE department = ?", (name,))
+            else:
+                stale = [(name, i) for i in list(lazy.loaded) + list(lazy._deleted)]
+                self.conn.executemany("DELETE FROM students WHERE department = ? AND id = ?", stale)
+                self.conn.executemany("DELETE FROM enrollments WHERE department = ? AND student_id = ?", stale)
+                self.conn.executemany("DELETE FROM gpa_history WHERE department = ? AND student_id = ?", stale)
+            self.conn.executemany("INSERT INTO students VALUES (?, ?, ?, ?, ?, ?)",
+                                  ((name, s.id, type(s).__name__, s.name, s.email, s.record.max_enrollments)
+                                   for s in students.values()))
+            self.conn.executemany("INSERT INTO enrollments VALUES (?, ?, ?, ?, ?)",
+                                  ((name, s.id, code, grade, i) for s in students.values()
+                                   for i, (code, grade) in enumerate(s.record.courses().items())))
+            self.conn.executemany("INSERT INTO gpa_history VALUES (?, ?, ?, ?)",
+                                  ((name, s.id, semester, gpa) for s in students.values()
+                                   for semester, gpa in s.record.gpa_history().items()))
+        if lazy is not None:
+            lazy.saved()
+
+    def load_department(self, name: str, lazy: bool = True) -> Department:
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM departments WHERE name = ?", (name,)).fetchone() is None:
+                raise KeyError(f"No stored department {name!r}")
+            dept = Department(name=name)
+            for fid, kind, fname, email, home in self.conn.execute(
+                    "SELECT id, kind, name, email, home FROM faculty WHERE department = ? ORDER BY rowid", (name,)):
+                dept.add_faculty(FACULTY_KINDS[kind](fid, fname, email, department=home))
+            prereqs: Dict[str, List[str]] = {}
+            for code, p in self.conn.execute("SELECT course_code, prerequisite FROM prerequisites "
+                                             "WHERE department = ? ORDER BY course_code, position", (name,)):
+                prereqs.setdefault(code, []).append(p)
+            for code, title, capacity, faculty_id in self.conn.execute(
+                    "SELECT code, title, capacity, faculty_id FROM courses WHERE department = ? ORDER BY rowid",
+                    (name,)):
+                dept.add_course(Course(code=code, title=title, capacity=capacity,
+                                       prerequisites=prereqs.get(code, []), assigned_faculty_id=faculty_id))
+            # Seat counts need every course's roster; IDs are interned so loaded students share them
+            for code, student_id in self.conn.execute(
+                    "SELECT course_code, student_id FROM rosters WHERE department = ?", (name,)):
+                course = dept.courses.get(code)
+                if course is not None:
+                    course.enrolled_students.add(sys.intern(student_id))
+            if lazy:
+                dept.students = LazyStudents(self, name)
+            else:
+                for s in self._load_students(name):
+                    dept.add_student(s)
+            return dept
+
+    def load_student(self, department: str, student_id: str) -> Optional[Person]:
+        with self.lock:
+            row = self.conn.execute("SELECT id, kind, name, email, max_enrollments FROM students "
+                                    "WHERE department = ? AND id = ?", (department, student_id)).fetchone()
+            if row is None:
+                return None
+            courses = {sys.intern(code): sys.intern(grade) for code, grade in self.conn.execute(
+                "SELECT course_code, grade FROM enrollments WHERE department = ? AND student_id = ? ORDER BY position",
+                (department, student_id))}
+            history = dict(self.conn.execute("SELECT semester, gpa FROM gpa_history WHERE department = ? "
+                                             "AND student_id = ?", (department, student_id)))
+        return self._build_student(row, courses, history)
+
+    def _load_students(self, department: str, only: Optional[Set[str]] = None) -> Iterator[Person]:
+        # Three ordered scans merged by student, rather than two lookups per student
+        courses: Dict[str, Dict[str, str]] = {}
+        history: Dict[str, Dict[str, float]] = {}
+        with self.lock:
+            for sid, code, grade in self.conn.execute("SELECT student_id, course_code, grade FROM enrollments WHERE "
+                                                      "department = ? ORDER BY student_id, position", (department,)):
+                courses.setdefault(sid, {})[sys.intern(code)] = sys.intern(grade)  # shared, not one copy per row
+            for sid, semester, gpa in self.conn.execute("SELECT student_id, semester, gpa FROM gpa_history "
+                                                        "WHERE department = ?", (department,)):
+                history.setdefault(sid, {})[semester] = gpa
+            rows = self.conn.execute("SELECT id, kind, name, email, max_enrollments FROM students "
+                                     "WHERE department = ? ORDER BY rowid", (department,)).fetchall()
+        for row in rows:
+            if only is not None and row[0] not in only:
+                continue
+            yield self._build_student(row, courses.get(row[0], {}), history.get(row[0]))
+
+    @staticmethod
+    def _build_student(row, courses: Dict[str, str], history: Optional[Dict[str, float]]) -> Person:
+        student_id, kind, name, email, max_enrollments = row
+        record = SecureStudentRecord.from_courses(courses, max_enrollments, history)
+        return STUDENT_KINDS[kind](student_id, name, email, record=record)
+
+
+def save_snapshot(dept: Department, path: str) -> None:
+    """Pickle (protocol 5) a whole department for fast cold starts; lazy students are read in bulk first."""
+    if isinstance(dept.students, LazyStudents):
+        dept = Department(dept.name, dept.faculty, dept.courses, dept.students.materialize())
+    with open(path, "wb") as f:
+        pickle.dump(dept, f, protocol=5)
+
+
+def load_snapshot(path: str) -> Department:
+    """Only load snapshots you wrote yourself: unpickling can run arbitrary code."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -1,8 +1,46 @@
 from __future__ import annotations
-from typing import Dict, List, Optional, Tuple
+import sys
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 from dataclasses import dataclass, field
+import numpy as np
 from .person import Student, UndergraduateStudent, GraduateStudent
 
+GRADES = ("IP", "A", "A-", "B+", "B", "B-", "C+", "C", "D", "F")  # index = grade code
+GRADE_CODES = {g: i for i, g in enumerate(GRADES)}
+# 4.0 scale in integer tenths, so running sums stay exact; IP counts for nothing
+GRADE_POINTS = {"IP": 0, "A": 40, "A-": 37, "B+": 33, "B": 30, "B-": 27, "C+": 23, "C": 20, "D": 10, "F": 0}
+POINTS_BY_CODE = np.array([GRADE_POINTS[g] for g in GRADES], dtype=np.int32)
+GRADE_WEIGHTS = {g: p / 10 for g, p in GRADE_POINTS.items()}  # the floats the GPA used to be summed from
+DEANS_LIST_GPA, PROBATION_GPA = 3.7, 2.0
+EMPTY = -1
+
+
+def is_gpa_tie(points: int, graded: int) -> bool:
+    """Whether points / (10 * graded) lies exactly halfway between two hundredths."""
+    return graded > 0 and (20 * points) % (2 * graded) == graded
+
+
+def gpa_from_totals(points: int, graded: int, letters: Callable[[], Iterable[str]]) -> float:
+    """GPA from summed grade points (tenths) over `graded` courses, as round(sum / n, 2) of the weights.
+
+    Away from a .xx5 tie the exact totals settle the rounding. At a tie the
+    old float sum's error decided it, and that depends on the order the
+    weights were added in, so only then are the record's `letters()` (in
+    course order) summed the old way.
+    """
+    if not graded:
+        return 0.0
+    if not is_gpa_tie(points, graded):
+        return (20 * points + graded) // (2 * graded) / 100
+    return round(sum(GRADE_WEIGHTS[g] for g in letters() if g != "IP") / graded, 2)
+
+
+def academic_status(gpa: float) -> str:
+    if gpa >= DEANS_LIST_GPA: return "Dean's List"
+    if gpa < PROBATION_GPA:  return "Probation"
+    return "Good Standing"
+
 
 @dataclass
 class SecureStudentRecord:
@@ -10,6 +48,15 @@ class SecureStudentRecord:
     max_enrollments: int = 6
     _gpa_history: Dict[str, float] = field(default_factory=dict)  # semester -> GPA
     _courses: Dict[str, str] = field(default_factory=dict)  # course_code -> grade or "IP"
+    _points: int = 0  # running grade-point sum (tenths) over graded courses
+    _graded: int = 0
+
+    @classmethod
+    def from_courses(cls, courses: Dict[str, str], max_enrollments: int = 6,
+                     gpa_history: Optional[Dict[str, float]] = None) -> SecureStudentRecord:
+        """Rebuild a record from stored course -> grade ("IP" if in progress) entries."""
+        graded = [GRADE_POINTS[g] for g in courses.values() if g != "IP"]
+        return cls(max_enrollments, dict(gpa_history or {}), dict(courses), sum(graded), len(graded))
 
     def set_semester_gpa(self, semester: str, gpa: float) -> None:
         if not (0.0 <= gpa <= 4.0):
@@ -19,6 +66,9 @@ class SecureStudentRecord:
     def get_semester_gpa(self, semester: str) -> Optional[float]:
         return self._gpa_history.get(semester)
 
+    def gpa_history(self) -> Dict[str, float]:
+        return dict(self._gpa_history)
+
     def enroll(self, course_code: str) -> None:
         if course_code in self._courses:
             raise ValueError(f"Already enrolled in {course_code}")
@@ -29,23 +79,206 @@ class SecureStudentRecord:
     def drop(self, course_code: str) -> None:
         if course_code not in self._courses:
             raise ValueError(f"Not enrolled in {course_code}")
-        del self._courses[course_code]
+        self._ungrade(self._courses.pop(course_code))
+
+    def _ungrade(self, letter: str) -> None:
+        if letter != "IP":
+            self._points -= GRADE_POINTS[letter]
+            self._graded -= 1
 
     def set_grade(self, course_code: str, letter: str) -> None:
         if course_code not in self._courses:
             raise ValueError("Course not found in record")
         if letter not in {"A", "A-", "B+", "B", "B-", "C+", "C", "D", "F"}:
             raise ValueError("Invalid letter grade")
+        self._ungrade(self._courses[course_code])
         self._courses[course_code] = letter
+        self._points += GRADE_POINTS[letter]
+        self._graded += 1
 
     def courses(self) -> Dict[str, str]:
         return dict(self._courses)
 
+    def has_course(self, course_code: str) -> bool:
+        return course_code in self._courses
+
+    def completed(self) -> Set[str]:
+        """Codes of courses with a final grade (not "IP")."""
+        return {code for code, grade in self._courses.items() if grade != "IP"}
+
+    def enrollment_count(self) -> int:
+        return len(self._courses)
+
+    def grade_totals(self) -> Tuple[int, int]:
+        """(grade points in tenths, number of graded courses)."""
+        return self._points, self._graded
+
+    def gpa(self) -> float:
+        return gpa_from_totals(self._points, self._graded, self._courses.values)
+
+
+class GradeStore:
+    """Array-backed enrollments and grades for many students, one row per record.
+
+    Each cell packs `course_id << 4 | grade code` into an int32 and rows are
+    kept left-packed in enrollment order, so a student costs one row of
+    `width` ints instead of two dicts of strings. Course codes are interned
+    once in `course_codes`. Records in different rows can be updated from
+    different threads; growing the store (new_record, ensure_width) should
+    happen before records are shared between threads.
+    """
+    def __init__(self, width: int = 6, capacity: int = 1024):
+        self.cells = np.full((capacity, width), EMPTY, dtype=np.int32)
+        self.counts = np.zeros(capacity, dtype=np.int16)
+        self.points = np.zeros(capacity, dtype=np.int32)  # running totals, as in SecureStudentRecord
+        self.graded = np.zeros(capacity, dtype=np.int16)
+        self.rows = 0
+        self.course_ids: Dict[str, int] = {}
+        self.course_codes: List[str] = []
+        self._lock = threading.Lock()
+
+    def course_id(self, course_code: str) -> int:
+        cid = self.course_ids.get(course_code)
+        if cid is None:
+            with self._lock:  # first sight of a code may race between records' threads
+                cid = self.course_ids.get(course_code)
+                if cid is None:
+                    course_code = sys.intern(course_code)
+                    cid = self.course_ids[course_code] = len(self.course_codes)
+                    self.course_codes.append(course_code)
+        return cid
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def ensure_width(self, width: int) -> None:
+        if width > self.cells.shape[1]:
+            extra = np.full((len(self.cells), width - self.cells.shape[1]), EMPTY, dtype=np.int32)
+            self.cells = np.hstack([self.cells, extra])
+
+    def new_record(self, max_enrollments: int = 6) -> CompactStudentRecord:
+        self.ensure_width(max_enrollments)
+        if self.rows == len(self.cells):
+            self.cells = np.vstack([self.cells, np.full_like(self.cells, EMPTY)])
+            self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+            self.points = np.concatenate([self.points, np.zeros_like(self.points)])
+            self.graded = np.concatenate([self.graded, np.zeros_like(self.graded)])
+        self.rows += 1
+        return CompactStudentRecord(self, self.rows - 1, max_enrollments)
+
+
+class CompactStudentRecord:
+    """SecureStudentRecord API over one row of a shared GradeStore."""
+    __slots__ = ("_store", "_row", "max_enrollments", "_gpa_history")
+
+    def __init__(self, store: GradeStore, row: int, max_enrollments: int = 6):
+        self._store = store
+        self._row = row
+        self.max_enrollments = max_enrollments
+        self._gpa_history: Optional[Dict[str, float]] = None  # created on first use
+
+    def _cells(self) -> List[int]:
+        return self._store.cells[self._row, :self._store.counts[self._row]].tolist()
+
+    def _find(self, course_code: str) -> int:
+        cid = self._store.course_ids.get(course_code)
+        if cid is not None:
+            for i, cell in enumerate(self._cells()):
+                if cell >> 4 == cid:
+                    return i
+        return -1
+
+    def set_semester_gpa(self, semester: str, gpa: float) -> None:
+        if not (0.0 <= gpa <= 4.0):
+            raise ValueError("GPA must be between 0.0 and 4.0")
+        if self._gpa_history is None:
+            self._gpa_history = {}
+        self._gpa_history[semester] = round(gpa, 2)
+
+    def get_semester_gpa(self, semester: str) -> Optional[float]:
+        return self._gpa_history.get(semester) if self._gpa_history else None
+
+    def gpa_history(self) -> Dict[str, float]:
+        return dict(self._gpa_history or {})
+
+    def enroll(self, course_code: str) -> None:
+        if self._find(course_code) >= 0:
+            raise ValueError(f"Already enrolled in {course_code}")
+        count = int(self._store.counts[self._row])
+        if count >= self.max_enrollments:
+            raise ValueError("Enrollment limit reached")
+        self._store.ensure_width(count + 1)
+        self._store.cells[self._row, count] = self._store.course_id(course_code) << 4  # "IP"
+        self._store.counts[self._row] = count + 1
+
+    def drop(self, course_code: str) -> None:
+        i = self._find(course_code)
+        if i < 0:
+            raise ValueError(f"Not enrolled in {course_code}")
+        count = int(self._store.counts[self._row])
+        row = self._store.cells[self._row]
+        self._ungrade(int(row[i]) & 15)
+        row[i:count - 1] = row[i + 1:count].copy()
+        row[count - 1] = EMPTY
+        self._store.counts[self._row] = count - 1
+
+    def set_grade(self, course_code: str, letter: str) -> None:
+        i = self._find(course_code)
+        if i < 0:
+            raise ValueError("Course not found in record")
+        if letter not in GRADE_CODES or letter == "IP":
+            raise ValueError("Invalid letter grade")
+        self._ungrade(int(self._store.cells[self._row, i]) & 15)
+        self._store.cells[self._row, i] = self._store.course_ids[course_code] << 4 | GRADE_CODES[letter]
+        self._store.points[self._row] += GRADE_POINTS[letter]
+        self._store.graded[self._row] += 1
+
+    def _ungrade(self, code: int) -> None:
+        if code:
+            self._store.points[self._row] -= POINTS_BY_CODE[code]
+            self._store.graded[self._row] -= 1
+
+    def courses(self) -> Dict[str, str]:
+        codes = self._store.course_codes
+        return {codes[cell >> 4]: GRADES[cell & 15] for cell in self._cells()}
+
+    def has_course(self, course_code: str) -> bool:
+        return self._find(course_code) >= 0
+
+    def completed(self) -> Set[str]:
+        """Codes of courses with a final grade (not "IP")."""
+        codes = self._store.course_codes
+        return {codes[cell >> 4] for cell in self._cells() if cell & 15}
+
+    def enrollment_count(self) -> int:
+        return int(self._store.counts[self._row])
+
+    def grade_totals(self) -> Tuple[int, int]:
+        """(grade points in tenths, number of graded courses)."""
+        return int(self._store.points[self._row]), int(self._store.graded[self._row])
+
+    def gpa(self) -> float:
+        return gpa_from_totals(*self.grade_totals(), lambda: (GRADES[cell & 15] for cell in self._cells()))
+
+
+StudentRecord = Union[SecureStudentRecord, CompactStudentRecord]
+
 
 class StudentManagerMixin:
-    """Mixin adding enrollment & GPA logic to Student."""
-    def __init__(self):
-        self.record = SecureStudentRecord()
+    """Mixin adding enrollment & GPA logic to Student.
+
+    Pass `record=store.new_record()` to keep the record in a shared GradeStore.
+    """
+    __slots__ = ()  # the concrete classes below hold `record` in a slot
+
+    def __init__(self, record: Optional[StudentRecord] = None):
+        self.record = record if record is not None else SecureStudentRecord()
 
     def enroll_course(self, course_code: str) -> None:
         self.record.enroll(course_code)
@@ -54,25 +287,24 @@ class StudentManagerMixin:
         self.record.drop(course_code)
 
     def calculate_gpa(self) -> float:
-        # Simple 4.0 scale mapping for completed courses; IP are ignored
-        weights = {"A":4.0,"A-":3.7,"B+":3.3,"B":3.0,"B-":2.7,"C+":2.3,"C":2.0,"D":1.0,"F":0.0}
-        grades = [weights[g] for g in self.record.courses().values() if g != "IP"]
-        return round(sum(grades)/len(grades), 2) if grades else 0.0
+        # 4.0 scale over completed courses (IP ignored), from the record's running totals
+        return self.record.gpa()
 
     def get_academic_status(self) -> str:
-        gpa = self.calculate_gpa()
-        if gpa >= 3.7: return "Dean's List"
-        if gpa < 2.0:  return "Probation"
-        return "Good Standing"
+        return academic_status(self.calculate_gpa())
 
 
 class ManagedUndergrad(UndergraduateStudent, StudentManagerMixin):
-    def __init__(self, person_id: str, name: str, email: str):
+    __slots__ = ("record",)
+
+    def __init__(self, person_id: str, name: str, email: str, record: Optional[StudentRecord] = None):
         UndergraduateStudent.__init__(self, person_id, name, email)
-        StudentManagerMixin.__init__(self)
+        StudentManagerMixin.__init__(self, record)
 
 
 class ManagedGrad(GraduateStudent, StudentManagerMixin):
-    def __init__(self, person_id: str, name: str, email: str):
+    __slots__ = ("record",)
+
+    def __init__(self, person_id: str, name: str, email: str, record: Optional[StudentRecord] = None):
         GraduateStudent.__init__(self, person_id, name, email)
-        StudentManagerMixin.__init__(self)
+        StudentManagerMixin.__init__(self, record)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Batched outlier scoring: every method scores all requested numeric columns
+# at once (optionally within groups, e.g. by rating_num or feed) and returns a
+# boolean DataFrame aligned with the input index. Missing values never flag.
+
+DEFAULT_THRESHOLDS = {"iqr": 1.5, "zscore": 3.0, "mad": 3.5, "rolling": 3.0}
+METHODS = sorted(DEFAULT_THRESHOLDS)
+
+def _stat(values, by, func, **kwargs):
+    if by is None:
+        return getattr(values, func)(**kwargs)
+    return values.groupby(by, dropna=True).transform(func, **kwargs)
+
+def outlier_mask(df, columns=None, method="iqr", by=None, threshold=None, window=50):
+    """Boolean mask (rows x columns) of outliers.
+
+    iqr      outside [Q1 - t*IQR, Q3 + t*IQR] (linear quantiles, like np.percentile)
+    zscore   |x - mean| / std > t (population std, like scipy.stats.zscore)
+    mad      0.6745 * |x - median| / MAD > t (Iglewicz-Hoaglin modified z-score)
+    rolling  |x - rolling mean| > t * rolling std over `window` rows, in row order
+    `by` names a column (or passes a Series) to score within groups.
+    """
+    if method not in DEFAULT_THRESHOLDS:
+        raise ValueError(f"Unknown outlier method {method!r}; choose from {METHODS}")
+    t = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    if columns is None:
+        columns = [c for c in df.select_dtypes("number").columns if not (isinstance(by, str) and c == by)]
+    values = df[list(columns)].astype(float)
+    keys = df[by] if isinstance(by, str) else by
+    if method == "iqr":
+        q1, q3 = _stat(values, keys, "quantile", q=0.25), _stat(values, keys, "quantile", q=0.75)
+        iqr = q3 - q1
+        mask = (values < q1 - t * iqr) | (values > q3 + t * iqr)
+    elif method == "zscore":
+        mean, std = _stat(values, keys, "mean"), _stat(values, keys, "std", ddof=0)
+        mask = (values - mean).abs() > t * std
+    elif method == "mad":
+        median = _stat(values, keys, "median")
+        mad = _stat((values - median).abs(), keys, "median")
+        mask = 0.6745 * (values - median).abs() > t * mad
+    else:
+        roll = lambda v: v.rolling(window, min_periods=2)
+        if keys is None:
+            mean, std = roll(values).mean(), roll(values).std()
+        else:
+            grouped = values.groupby(keys, dropna=True)
+            mean = grouped.transform(lambda v: roll(v).mean())
+            std = grouped.transform(lambda v: roll(v).std())
+        mask = (values - mean).abs() > t * std
+    return mask & values.notna()
+
+def mask_to_ranges(mask):
+    """Run-length encode a 1-D boolean mask as [start, stop) row-position pairs."""
+    flags = np.asarray(mask, dtype=np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags, [0]))))
+    return edges.reshape(-1, 2).tolist()
+
+def positions_to_ranges(positions):
+    """mask_to_ranges for sorted, unique row positions, in O(len(positions)) memory."""
+    idx = np.asarray(positions, dtype=np.int64)
+    if not len(idx):
+        return []
+    breaks = np.flatnonzero(np.diff(idx) != 1) + 1
+    starts = idx[np.concatenate(([0], breaks))]
+    stops = idx[np.concatenate((breaks - 1, [len(idx) - 1]))] + 1
+    return np.column_stack([starts, stops]).tolist()
+
+def ranges_to_positions(ranges):
+    return np.concatenate([np.arange(a, b) for a, b in ranges]) if ranges else np.empty(0, dtype=int)
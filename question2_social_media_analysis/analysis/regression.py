@@ -0,0 +1,66 @@
+import math
+import numpy as np
+
+from analysis.streaming import CoMoments
+
+# Simple linear regression (price on rating) from the same pairwise-complete
+# co-moments stats.py uses for the correlation, so a fit can come from one
+# pass over the data, from merged chunk/shard states, or from a cached
+# analysis_summary.json without touching the rows again. plots.py draws the
+# line and its confidence band from one of these.
+
+class LinearFit:
+    """OLS fit y = slope * x + intercept with t-based confidence bands."""
+    def __init__(self, n, mean_x, mean_y, m2_x, m2_y, c_xy, confidence=0.95):
+        self.n, self.mean_x, self.mean_y = n, mean_x, mean_y
+        self.m2_x, self.m2_y, self.c_xy = m2_x, m2_y, c_xy
+        self.confidence = confidence
+        self.slope = c_xy / m2_x
+        self.intercept = mean_y - self.slope * mean_x
+        # Residual variance; clipped because rounding can push a perfect fit below 0
+        self.s2 = max(m2_y - self.slope * c_xy, 0.0) / (n - 2) if n > 2 else math.nan
+
+    @classmethod
+    def from_moments(cls, moments, confidence=0.95):
+        """None when there are fewer than two complete pairs or x is constant."""
+        if moments.n < 2 or moments.m2_x <= 0:
+            return None
+        return cls(moments.n, moments.mean_x, moments.mean_y, moments.m2_x, moments.m2_y, moments.c_xy, confidence)
+
+    @classmethod
+    def from_arrays(cls, x, y, confidence=0.95):
+        """Fit on pairwise-complete (x, y) rows."""
+        return cls.from_moments(CoMoments().update(x, y), confidence)
+
+    def predict(self, xs):
+        return self.slope * np.asarray(xs, dtype=float) + self.intercept
+
+    def band(self, xs, prediction=False):
+        """(low, high) confidence band for the mean response (or a prediction band) at xs."""
+        from scipy import stats
+        xs = np.asarray(xs, dtype=float)
+        if not self.n > 2:
+            nan = np.full(xs.shape, np.nan)
+            return nan, nan
+        t = stats.t.ppf(0.5 + self.confidence / 2, self.n - 2)
+        se = np.sqrt(self.s2 * ((1 if prediction else 0) + 1 / self.n + (xs - self.mean_x) ** 2 / self.m2_x))
+        y = self.predict(xs)
+        return y - t * se, y + t * se
+
+    def to_dict(self):
+        se_slope = math.sqrt(self.s2 / self.m2_x) if self.n > 2 else math.nan
+        return {
+            "n": self.n, "slope": self.slope, "intercept": self.intercept,
+            "r2": self.c_xy ** 2 / (self.m2_x * self.m2_y) if self.m2_y > 0 else math.nan,
+            "se_slope": se_slope,
+            "se_intercept": math.sqrt(self.s2 * (1 / self.n + self.mean_x ** 2 / self.m2_x)) if self.n > 2 else math.nan,
+            "residual_std": math.sqrt(self.s2) if self.n > 2 else math.nan,
+            "confidence": self.confidence,
+            # Sufficient statistics, so the fit (and its bands) can be rebuilt
+            "moments": {"n": self.n, "mean_x": self.mean_x, "mean_y": self.mean_y,
+                        "m2_x": self.m2_x, "m2_y": self.m2_y, "c_xy": self.c_xy},
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**d["moments"], confidence=d["confidence"])
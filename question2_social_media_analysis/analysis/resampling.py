@@ -0,0 +1,125 @@
+import numpy as np
+
+# Vectorized resampling tests for stats.py. Each resample reduces to a few
+# sufficient statistics (group sums of price, or bootstrap sums of x, y, x^2,
+# y^2, xy), so only those are computed, one resample at a time over
+# cache-sized arrays: the (batch x rows) matrices this used to build cost more
+# in memory traffic than the random draws themselves.
+#
+# A permutation only has to say which rows land in which rating group. Rows
+# are drawn without replacement (in random order) for every group but the
+# largest, whose sum is the total minus the rest, and the draws are cut into
+# group-sized runs with np.add.reduceat. A bootstrap resample is a bincount of
+# n row draws, reduced with one (5 x rows) product.
+#
+# Resamples run in fixed-size batches, each seeded with its own child of
+# SeedSequence(seed), so a given (seed, resamples) gives the same result for
+# any --workers. With workers, the rows are sent to each process once.
+
+BATCH = 250
+
+_shared = None
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+def _call(func, size, seed_seq):
+    return func(_shared, size, seed_seq)
+
+def _run(func, shared, n_resamples, seed, workers):
+    """Run func(shared, batch_size, seed_seq) over all batches; concatenate the results."""
+    sizes = [min(BATCH, n_resamples - start) for start in range(0, n_resamples, BATCH)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if not workers or workers == 1 or len(sizes) == 1:
+        parts = [func(shared, size, ss) for size, ss in zip(sizes, seeds)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+            parts = list(pool.map(_call, [func] * len(sizes), sizes, seeds))
+    return np.concatenate(parts) if parts else np.empty(0)
+
+def _f_stats(sums, counts, total_ss, n, k):
+    # y is centred, so the grand-mean correction term is ~0 and dropped
+    between = (sums ** 2 / counts).sum(axis=-1)
+    within = total_ss - between
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (between / (k - 1)) / (within / (n - k))
+
+def _perm_batch(shared, size, seed_seq):
+    y, counts, total_ss = shared
+    rng = np.random.default_rng(seed_seq)
+    n, k = len(y), len(counts)
+    # counts are sorted with the largest group last; it takes the rows not drawn
+    drawn = n - int(counts[-1])
+    starts = np.concatenate([[0], np.cumsum(counts[:-2])]).astype(np.intp)
+    total = y.sum()
+    sums = np.empty((size, k))
+    for i in range(size):
+        sums[i, :-1] = np.add.reduceat(y[rng.choice(n, drawn, replace=False)], starts)
+    sums[:, -1] = total - sums[:, :-1].sum(axis=1)
+    return _f_stats(sums, counts, total_ss, n, k)
+
+def permutation_anova(values, groups, n_resamples=10_000, seed=None, workers=None):
+    """One-way ANOVA F with a permutation p-value (group labels shuffled across rows).
+
+    p = (1 + #{F_perm >= F_obs}) / (1 + n_resamples). Rows with a missing
+    value or group are dropped, as in the parametric test.
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+    keep = ~np.isnan(values) & ~np.asarray(groups != groups)
+    values, groups = values[keep], groups[keep]
+    _, codes = np.unique(groups, return_inverse=True)
+    counts = np.bincount(codes).astype(float)
+    n, k = len(values), len(counts)
+    if k < 2 or n <= k:
+        return {}
+    y = values - values.mean()
+    total_ss = float((y ** 2).sum())
+    f_obs = float(_f_stats(np.bincount(codes, weights=y), counts, total_ss, n, k))
+    f_perm = _run(_perm_batch, (y, np.sort(counts), total_ss), n_resamples, seed, workers)
+    # Tolerance so permutations equal to the observed labelling count as >=
+    hits = int((f_perm >= f_obs * (1 - 1e-12)).sum())
+    return {"anova_f": f_obs, "p_value": (1 + hits) / (1 + len(f_perm)), "resamples": len(f_perm)}
+
+def _boot_batch(shared, size, seed_seq):
+    feats = shared  # (5 x rows): x, y, x^2, y^2, xy
+    n = feats.shape[1]
+    rng = np.random.default_rng(seed_seq)
+    sums = np.empty((size, 5))
+    for i in range(size):
+        # How often each row is drawn; one product gives Sx, Sy, Sxx, Syy, Sxy
+        sums[i] = feats @ np.bincount(rng.integers(0, n, n, dtype=np.int32), minlength=n)
+    sx, sy, sxx, syy, sxy = sums.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+
+def bootstrap_correlation(x, y, n_resamples=10_000, confidence=0.95, seed=None, workers=None):
+    """Pearson r with a percentile bootstrap confidence interval (pairwise complete rows)."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    keep = ~np.isnan(x) & ~np.isnan(y)
+    x, y = x[keep], y[keep]
+    if len(x) < 3:
+        return {}
+    # Centre first so the sums-of-products form below stays well conditioned
+    x, y = x - x.mean(), y - y.mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = float((x * y).sum() / np.sqrt((x ** 2).sum() * (y ** 2).sum()))
+    feats = np.vstack([x, y, x * x, y * y, x * y])
+    boot = _run(_boot_batch, feats, n_resamples, seed, workers)
+    boot = boot[~np.isnan(boot)]
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(boot, [alpha, 1 - alpha]) if len(boot) else (np.nan, np.nan)
+    return {"r": r, "ci_low": float(low), "ci_high": float(high), "confidence": confidence, "resamples": len(boot)}
+
+def resampling_tests(df, n_resamples=10_000, seed=None, workers=None):
+    """Permutation ANOVA (price by rating) and bootstrap CI for corr(price, rating)."""
+    if not {"price", "rating_num"} <= set(df.columns):
+        return {}
+    kw = dict(n_resamples=n_resamples, seed=seed, workers=workers)
+    price, rating = df["price"].to_numpy(dtype=float, na_value=np.nan), df["rating_num"].to_numpy(dtype=float, na_value=np.nan)
+    return {
+        "anova_price_by_rating": permutation_anova(price, rating, **kw),
+        "correlation_price_rating": bootstrap_correlation(price, rating, **kw),
+    }
@@ -1,7 +1,18 @@
-import os, argparse, json
+import os, sys, argparse, json
 import numpy as np
 import pandas as pd
-from scipy import stats
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.tables import read_table, iter_table_chunks, table_columns
+from analysis.streaming import StreamingSummary
+from analysis.outliers import outlier_mask, mask_to_ranges, METHODS
+from analysis.resampling import resampling_tests
+from analysis.regression import LinearFit
+from common.instrumentation import recorder, profiled
+
+# Outliers are always reported as [start, stop) row-position ranges with
+# a separate count, whatever the path or the number of outliers, so
+# summaries from different runs can be compared key for key.
 
 def describe(df):
     desc = {
@@ -11,17 +22,15 @@ def describe(df):
     return desc
 
 def detect_outliers(series, method="iqr"):
-    series = series.dropna()
-    if series.empty:
-        return []
-    if method == "iqr":
-        q1, q3 = np.percentile(series, [25, 75])
-        iqr = q3 - q1
-        low, high = q1 - 1.5*iqr, q3 + 1.5*iqr
-        idx = series[(series < low) | (series > high)].index.tolist()
-        return idx
-    z = np.abs(stats.zscore(series))
-    return series[z > 3].index.tolist()
+    mask = outlier_mask(series.to_frame(), method=method if method in METHODS else "zscore").iloc[:, 0]
+    return series.index[mask.to_numpy()].tolist()
+
+def outlier_summary(df, method="iqr", by=None):
+    """Price outliers as [start, stop) row-position ranges, plus their count."""
+    if "price" not in df:
+        return {"outliers_price_ranges": [], "outliers_price_count": 0}
+    mask = outlier_mask(df, ["price"], method=method, by=by).iloc[:, 0].to_numpy()
+    return {"outliers_price_ranges": mask_to_ranges(mask), "outliers_price_count": int(mask.sum())}
 
 def correlation(df):
     cols = [c for c in ["price", "rating_num"] if c in df]
@@ -30,6 +39,14 @@ def correlation(df):
     corr = df[cols].corr().to_dict()
     return corr
 
+def trend(df):
+    """Price-on-rating OLS fit (pairwise-complete rows) with its sufficient statistics."""
+    if not {"price", "rating_num"} <= set(df.columns):
+        return {}
+    fit = LinearFit.from_arrays(df["rating_num"].to_numpy(dtype=float, na_value=np.nan),
+                                df["price"].to_numpy(dtype=float, na_value=np.nan))
+    return fit.to_dict() if fit else {}
+
 def hypothesis_test(df):
     # Example: one-way ANOVA across rating groups vs price
     if not {"price", "rating_num"} <= set(df.columns):
@@ -37,26 +54,152 @@ def hypothesis_test(df):
     groups = [g["price"].dropna().values for _, g in df.groupby("rating_num")]
     if len(groups) < 2:
         return {}
+    from scipy import stats
     stat, p = stats.f_oneway(*groups)
     return {"anova_f": float(stat), "p_value": float(p)}
 
-def main(input_csv, out_dir):
+def analyze_streaming(input_path, chunksize=100_000, summary=None):
+    """Same results as the in-memory path from one streaming pass over chunks.
+
+    Only the price/rating columns are read. Outlier indices need the IQR
+    bounds first, so they are resolved by a second, price-only scan; all
+    other figures come from the single pass (see analysis/streaming.py for
+    tolerances).
+
+    Given a previous `summary`, only rows after `summary.rows` are read and
+    folded in (the input is assumed to be append-only). Earlier outliers are
+    re-checked against the new bounds, but earlier rows that only now fall
+    outside them are not revisited, so the outliers are flagged approximate;
+    a full run recomputes them exactly.
+    Returns (results, summary).
+    """
+    summary = summary or StreamingSummary()
+    start = summary.rows
+    wanted = [c for c in ["price", "rating_num"] if c in table_columns(input_path)]
+    rec = recorder()
+    with rec.step("summary_pass") as step:
+        for chunk in iter_table_chunks(input_path, chunksize, columns=wanted, start=start):
+            summary.update(chunk)
+        step["rows"] = summary.rows - start
+    if "price" in wanted:
+        outlier_pass(summary, input_path, chunksize, start)
+    return summary.results(), summary
+
+def outlier_pass(summary, input_path, chunksize=100_000, start=0):
+    """Collect the rows from `start` on that fall outside the summary's IQR bounds.
+
+    Only the outliers themselves are kept, so memory stays O(outliers).
+    From start=0 the result is exact; otherwise the earlier outliers are
+    only re-checked against the new bounds.
+    """
+    with recorder().step("outlier_pass", rows=summary.rows - start):
+        low, high = summary.iqr_bounds()
+        found = [(i, v) for i, v in summary.outliers if v < low or v > high] if start else []
+        for chunk in iter_table_chunks(input_path, chunksize, columns=["price"], start=start):
+            price = chunk["price"].to_numpy(dtype=float, na_value=np.nan)
+            hits = np.flatnonzero((price < low) | (price > high))
+            found.extend(zip(chunk.index[hits].tolist(), price[hits].tolist()))
+        summary.outliers = sorted(found)
+        summary.outliers_exact = start == 0
+    return summary
+
+def load_state(path):
+    with open(path, encoding="utf-8") as f:
+        return StreamingSummary.from_state(json.load(f))
+
+def save_state(summary, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summary.to_state(), f)
+    os.replace(tmp, path)
+
+def merge_states(paths):
+    """Combine per-shard/per-day states (in the given row order) into one summary."""
+    summary = StreamingSummary()
+    for p in paths:
+        summary.merge(load_state(p))
+    return summary
+
+def analyze(df, outlier_method="iqr", outlier_by=None, resamples=0, seed=None, workers=None):
+    rec, rows, results = recorder(), len(df), {}
+    with rec.step("describe", rows=rows):
+        results["descriptive"] = describe(df)
+    with rec.step("outliers", rows=rows):
+        results.update(outlier_summary(df, outlier_method, outlier_by if outlier_by in df else None))
+    with rec.step("correlation", rows=rows):
+        results["correlations"] = correlation(df)
+        results["trend_price_on_rating"] = trend(df)
+    with rec.step("anova", rows=rows):
+        results["anova_price_by_rating"] = hypothesis_test(df)
+    results["category_popularity"] = df["rating_num"].value_counts(dropna=False).to_dict() if "rating_num" in df else {}
+    if resamples:
+        with rec.step("resampling", rows=rows):
+            results["resampling"] = resampling_tests(df, resamples, seed, workers=workers)
+    return results
+
+def main(input_csv, out_dir, chunksize=None, incremental=False, state_paths=None,
+         outlier_method="iqr", outlier_by=None, resamples=0, seed=None, workers=None):
+    """Write analysis_summary.json.
+
+    Streaming runs (--chunksize, --incremental, --merge-states) also persist
+    analysis_state.json next to it: mergeable counts, moments, co-moments,
+    per-rating group stats and quantile sketches. --incremental folds only the
+    rows added since that state; --merge-states combines shard/day states.
+    Merged and incremental outliers are approximate (flagged in the summary)
+    unless --input gives the full table to rescan against the final bounds.
+    --outlier-method/--outlier-by and --resamples (permutation ANOVA and a
+    bootstrap CI for the correlation) apply to the in-memory path only;
+    streaming runs use the global IQR bounds and parametric tests.
+    Raises ValueError if a --merge-states input is the state it would write.
+    """
     os.makedirs(out_dir, exist_ok=True)
-    df = pd.read_csv(input_csv)
-    results = {
-        "descriptive": describe(df),
-        "outliers_price_idx": detect_outliers(df["price"]) if "price" in df else [],
-        "correlations": correlation(df),
-        "anova_price_by_rating": hypothesis_test(df),
-        "category_popularity": df["rating_num"].value_counts(dropna=False).to_dict() if "rating_num" in df else {}
-    }
+    state_path = os.path.join(out_dir, "analysis_state.json")
+    if state_paths:
+        # The merged state is written to state_path; if that is also an input,
+        # a rerun would merge the combined rows into themselves
+        inputs = [p for p in state_paths if os.path.realpath(p) == os.path.realpath(state_path)]
+        if inputs:
+            raise ValueError(f"--merge-states input {inputs[0]} is the output state {state_path}; "
+                             "choose another --out or move the input")
+        summary = merge_states(state_paths)
+        if input_csv:
+            # The shards' rows, in state order: rescan against the merged bounds
+            outlier_pass(summary, input_csv, chunksize or 100_000)
+        results = summary.results()
+    elif chunksize or incremental:
+        previous = load_state(state_path) if incremental and os.path.exists(state_path) else None
+        if previous is not None:
+            print(f"Incremental: {previous.rows} rows already summarized")
+        results, summary = analyze_streaming(input_csv, chunksize or 100_000, previous)
+    else:
+        with recorder().step("read") as step:
+            df = read_table(input_csv)
+            step["rows"] = len(df)
+        summary, results = None, analyze(df, outlier_method, outlier_by, resamples, seed, workers)
+    if summary is not None:
+        save_state(summary, state_path)
+    results["timing"] = recorder().timing()
     with open(os.path.join(out_dir, "analysis_summary.json"), "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2)
     print("Saved analysis summary to", os.path.join(out_dir, "analysis_summary.json"))
+    return results
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True)
+    ap.add_argument("--input", help="Cleaned table (.csv, .parquet or .feather)")
     ap.add_argument("--out", default="reports")
+    ap.add_argument("--chunksize", type=int, default=None, help="Single streaming pass over chunks of this many rows (larger-than-memory inputs)")
+    ap.add_argument("--incremental", action="store_true", help="Fold only rows added since the saved analysis_state.json")
+    ap.add_argument("--merge-states", nargs="+", default=None, metavar="STATE", help="Combine analysis_state.json files from shards/days (with --input: rescan it for exact outliers)")
+    ap.add_argument("--outlier-method", choices=METHODS, default="iqr", help="Price outlier rule (in-memory path)")
+    ap.add_argument("--outlier-by", default=None, help="Score outliers within groups of this column, e.g. rating_num")
+    ap.add_argument("--resamples", type=int, default=0, help="Add permutation/bootstrap tests with this many resamples (in-memory path)")
+    ap.add_argument("--seed", type=int, default=None, help="Seed for --resamples")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes for --resamples (default: all CPUs)")
+    ap.add_argument("--profile", action="store_true", help="Write analyze.pstats + analyze_trace.json to --out")
     args = ap.parse_args()
-    main(args.input, args.out)
+    if not args.input and not args.merge_states:
+        ap.error("--input is required unless --merge-states is given")
+    with profiled("analyze", args.out if args.profile else None):
+        main(args.input, args.out, args.chunksize, args.incremental, args.merge_states,
+             args.outlier_method, args.outlier_by, args.resamples, args.seed, args.workers)
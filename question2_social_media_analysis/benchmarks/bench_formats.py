@@ -0,0 +1,66 @@
+import os, sys, time, json, argparse, tempfile, resource
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.tables import read_table, write_table
+
+# Load time and peak RSS of CSV vs Parquet vs Feather for a books-shaped table.
+# Each write and each load runs in a fresh spawned process (not forked, which
+# would inherit the parent's pages), and the frame is only ever built inside
+# the writer, so a load's peak RSS is its own.
+
+RATINGS = np.array(["One", "Two", "Three", "Four", "Five"])
+
+def synth_books(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n)
+    rating_idx = rng.integers(0, 5, n)
+    return pd.DataFrame({
+        "title": pd.Series(ids).map("Book title number {}".format),
+        "price": rng.uniform(10, 60, n).round(2),
+        "stock": "In stock",
+        "rating": RATINGS[rating_idx],
+        "url": pd.Series(ids).map("http://books.toscrape.com/catalogue/book_{}/index.html".format),
+        "rating_num": (rating_idx + 1).astype(float),
+    })
+
+def _load(path, queue):
+    start = time.perf_counter()
+    df = read_table(path) if path else None
+    elapsed = time.perf_counter() - start
+    queue.put({"seconds": elapsed, "rows": 0 if df is None else len(df),
+               "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+
+def _write(path, rows, queue):
+    df = synth_books(rows)
+    start = time.perf_counter()
+    write_table(df, path, dataset="books")
+    queue.put({"write_seconds": time.perf_counter() - start})
+
+def _in_child(target, *args):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=(*args, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+def measure(path):
+    return _in_child(_load, path)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--workdir", default=None, help="Where to write the test files (default: temp dir)")
+    args = ap.parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_formats_")
+    os.makedirs(workdir, exist_ok=True)
+    results = {"rows": args.rows, "baseline": measure(None)}
+    for ext in (".csv", ".parquet", ".feather"):
+        path = os.path.join(workdir, "books" + ext)
+        written = _in_child(_write, path, args.rows)
+        results[ext[1:]] = dict(measure(path), **written, size_mb=os.path.getsize(path) / 2**20)
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,58 @@
+import os, sys, glob, time, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_collection.parsers import ENGINES
+
+# Parity check + pages/sec for the listing parser engines over saved pages.
+# Every engine must reproduce the rows of the "bs4" reference exactly.
+# fixtures/listing/ holds three books.toscrape-style pages, the default set:
+# UTF-8 bytes read as ISO-8859-1 (what requests does for the real site), a page
+# actually encoded in ISO-8859-1, and a last page with no "next" link.
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "listing", "*.html")
+
+def load_pages(patterns):
+    paths = sorted(p for pat in patterns for p in glob.glob(pat, recursive=True))
+    pages = []
+    for p in paths:
+        with open(p, "rb") as f:
+            pages.append((p, f.read()))
+    return pages
+
+def check_parity(pages, base_url, encoding):
+    mismatches = []
+    for path, content in pages:
+        url = base_url or "file://" + os.path.abspath(path)
+        ref = ENGINES["bs4"](content, url, encoding)
+        for name, engine in ENGINES.items():
+            if name != "bs4" and engine(content, url, encoding) != ref:
+                mismatches.append((name, path))
+    return mismatches
+
+def bench(pages, base_url, encoding, repeat):
+    results = {}
+    for name, engine in ENGINES.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for path, content in pages:
+                engine(content, base_url or path, encoding)
+        elapsed = time.perf_counter() - start
+        results[name] = len(pages) * repeat / elapsed
+    return results
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", nargs="+", default=[FIXTURES], help="Glob(s) of saved listing pages (default: the fixtures)")
+    ap.add_argument("--base-url", default=None, help="URL the pages were saved from (default: file URL)")
+    ap.add_argument("--encoding", default="ISO-8859-1", help="Encoding requests used for these pages")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    pages = load_pages(args.pages)
+    if not pages:
+        sys.exit("No pages matched")
+    mismatches = check_parity(pages, args.base_url, args.encoding)
+    for name, path in mismatches:
+        print(f"PARITY MISMATCH: {name} on {path}", file=sys.stderr)
+    for name, rate in bench(pages, args.base_url, args.encoding, args.repeat).items():
+        print(f"{name:>6}: {rate:8.1f} pages/sec")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,77 @@
+import os, sys, json, argparse, subprocess, time
+
+Q2_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# CLI startup cost of each Q2 script, measured as `python -X importtime
+# <script> --help` (module import + argparse, no work). Reports wall time, the
+# import total and the slowest top-level imports, and exits 1 when a script
+# goes over --budget-ms or imports a module that should only load on use.
+
+SCRIPTS = [
+    "data_collection/books_scraper.py",
+    "data_collection/enrich_books.py",
+    "data_collection/rss_collect.py",
+    "data_processing/cleaning.py",
+    "analysis/stats.py",
+    "visualizations/plots.py",
+    "pipeline.py",
+]
+# Heavy dependencies that no script needs just to start
+LAZY = ["scipy", "matplotlib", "plotly", "statsmodels", "bs4", "lxml", "feedparser", "requests"]
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} and the top-level (depth 0) modules."""
+    modules, top = {}, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        stripped = name.lstrip()
+        modules[stripped] = (int(self_us), int(cumulative))
+        if len(name) - len(stripped) <= 1:
+            top.append(stripped)
+    return modules, top
+
+def measure(script, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", os.path.join(Q2_ROOT, script), "--help"],
+                              capture_output=True, text=True, cwd=Q2_ROOT)
+        wall = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            raise RuntimeError(f"{script} --help failed:\n{proc.stderr[-2000:]}")
+        if best is None or wall < best[0]:
+            best = (wall, proc.stderr)
+    wall, stderr = best
+    modules, top = parse_importtime(stderr)
+    slowest = sorted(top, key=lambda m: -modules[m][1])[:5]
+    return {
+        "wall_ms": wall,
+        "import_ms": sum(modules[m][1] for m in top) / 1000,
+        "slowest": {m: modules[m][1] / 1000 for m in slowest},
+        "eager_heavy": sorted(m for m in LAZY if m in modules),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scripts", nargs="+", default=SCRIPTS)
+    ap.add_argument("--budget-ms", type=float, default=1000, help="Max wall time per script for `--help`")
+    ap.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    ap.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = ap.parse_args()
+    results, failures = {}, []
+    for script in args.scripts:
+        r = results[script] = measure(script, args.repeat)
+        if r["wall_ms"] > args.budget_ms:
+            failures.append(f"{script}: {r['wall_ms']:.0f} ms > {args.budget_ms:.0f} ms budget")
+        if r["eager_heavy"]:
+            failures.append(f"{script}: imports {', '.join(r['eager_heavy'])} at startup")
+        if not args.json:
+            slow = ", ".join(f"{m} {ms:.0f}" for m, ms in r["slowest"].items())
+            print(f"{script:<36} {r['wall_ms']:7.0f} ms wall  {r['import_ms']:7.0f} ms imports  ({slow})")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    for f in failures:
+        print("OVER BUDGET:", f, file=sys.stderr)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,60 @@
+import os, sys, argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.cleaning import normalize_text, normalize_series
+
+# Randomized property check: normalize_series must give, cell for cell, what
+# normalize_text gives. Cells mix every kind of whitespace (including the
+# Unicode and \x1c-\x1f separators), Unicode word characters, kept and
+# stripped punctuation, and non-str cells; NaN and None count as equal.
+
+ALPHABET = list(
+    "ab Z09_"                                   # ASCII word chars and a plain space
+    " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0"   # whitespace str.split() and \s agree on
+    "  　"
+    "éßÆ中文٣ǅ́"                           # Unicode \w (letters, digits, a combining mark)
+    "-.,£$%:/"                                  # punctuation normalize_text keeps
+    "!?@#&*()[]\"'’«»😀​\x00"             # and some it strips
+)
+NON_STR = [None, np.nan, 0, 1.5, True, pd.NA, pd.Timestamp("2024-01-01")]
+
+def random_cells(rng, n, max_len=12):
+    cells = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.1:
+            cells.append(NON_STR[rng.integers(len(NON_STR))])
+        elif r < 0.3 and cells:
+            cells.append(cells[rng.integers(len(cells))])  # repeats exercise the factorize path
+        else:
+            cells.append("".join(rng.choice(ALPHABET, rng.integers(0, max_len + 1))))
+    return cells
+
+def same(a, b):
+    if pd.api.types.is_scalar(a) and pd.api.types.is_scalar(b) and pd.isna(a) and pd.isna(b):
+        return True
+    return type(a) is type(b) and a == b
+
+def check(cells, dtype):
+    col = pd.Series(cells, dtype=dtype)
+    got = normalize_series(col)
+    assert got.dtype == col.dtype, f"dtype {col.dtype} became {got.dtype}"
+    for cell, value in zip(col.astype(object), got.astype(object)):
+        want = normalize_text(cell)
+        assert same(value, want), f"{cell!r}: normalize_series gave {value!r}, normalize_text {want!r}"
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=500)
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+    for _ in range(args.rounds):
+        cells = random_cells(rng, args.rows)
+        check(cells, object)
+        # Text-only columns, as read_csv gives them (str dtype, missing as NaN)
+        check([c if isinstance(c, str) else np.nan for c in cells], "str")
+    print(f"ok  {args.rounds} rounds x {args.rows} cells, object and str columns")
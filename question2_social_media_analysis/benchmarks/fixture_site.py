@@ -0,0 +1,80 @@
+import os, re, sys, time, argparse, threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Serves the saved listing pages in fixtures/listing/ over HTTP, so the
+# crawlers can run offline. The site can misbehave on purpose: `fail` gives a
+# page that many 503s before it is served, and pager=False strips the "Page N
+# of M" pager so crawlers must follow "next" links. Every request is logged
+# as (monotonic time, page, status). Pages are sent as text/html without a
+# charset, as books.toscrape.com does.
+
+LISTING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "listing")
+PAGER_RE = re.compile(rb'<li class="current">.*?</li>', re.S)
+
+class FixtureSite(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fail=None, pager=True, port=0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.fail = dict(fail or {})  # page -> 503s left to send
+        self.pager = pager
+        self.log = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/page-1.html"
+
+    def requests_for(self, page):
+        return [t for t, p, _ in self.log if p == page]
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        site, page = self.server, os.path.basename(self.path.split("?")[0])
+        path = os.path.join(LISTING, page)
+        with site.lock:
+            failing = site.fail.get(page, 0) > 0
+            if failing:
+                site.fail[page] -= 1
+            status = 503 if failing else 200 if os.path.isfile(path) else 404
+            site.log.append((time.monotonic(), page, status))
+        if status != 200:
+            self.send_error(status)
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        if not site.pager:
+            body = PAGER_RE.sub(b"", body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@contextmanager
+def serve(**kwargs):
+    """Run a FixtureSite on a free local port for the duration of the block."""
+    site = FixtureSite(**kwargs)
+    thread = threading.Thread(target=site.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield site
+    finally:
+        site.shutdown()
+        site.server_close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--no-pager", action="store_true", help="Strip the pager so crawlers follow next links")
+    args = ap.parse_args()
+    site = FixtureSite(pager=not args.no_pager, port=args.port)
+    print(f"Serving {LISTING} at {site.url} (Ctrl-C to stop)")
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
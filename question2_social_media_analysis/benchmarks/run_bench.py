@@ -0,0 +1,141 @@
+import os, sys, io, json, time, argparse, platform, resource, subprocess, contextlib
+from datetime import datetime, timezone
+import multiprocessing as mp
+
+Q2_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, Q2_ROOT)
+from benchmarks.synth import write_synth, KINDS
+
+# Times cleaning.main -> stats.main -> plots.main on synthetic inputs and
+# appends the results to a JSON history file, comparing each stage with the
+# previous run of the same (kind, rows, stage) on this host. Every stage runs
+# in a fresh spawned process, so its peak RSS (ru_maxrss) is its own; module
+# imports happen before the timer starts and are reported separately.
+
+STAGES = ["clean", "analyze", "plot"]
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_history.json")
+
+def _stage(stage, input_path, out_dir, chunksize, queue):
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if stage == "clean":
+                from data_processing.cleaning import main
+                run = lambda: main(input_path, out_dir, chunksize=chunksize)
+            elif stage == "analyze":
+                from analysis.stats import main
+                run = lambda: main(input_path, out_dir, chunksize=chunksize)
+            else:
+                from visualizations.plots import main
+                run = lambda: main(input_path, out_dir)
+            import_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        queue.put({"seconds": elapsed, "import_rss_mb": import_rss,
+                   "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+def measure(stage, input_path, out_dir, chunksize=None):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_stage, args=(stage, input_path, out_dir, chunksize, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+def git_commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], cwd=Q2_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=Q2_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def run(kinds, sizes, stages, workdir, chunksize=None, seed=0, messiness=0.1):
+    results = []
+    for kind in kinds:
+        for rows in sizes:
+            raw = os.path.join(workdir, f"{kind}_{rows}_s{seed}_m{messiness}.csv")
+            if not os.path.exists(raw):
+                print(f"Generating {rows:,} {kind} rows -> {raw}")
+                write_synth(kind, rows, raw, seed, messiness)
+            out_dir = os.path.join(workdir, f"{kind}_{rows}")
+            # Each stage reads the previous stage's output, as in the README pipeline
+            inputs = {"clean": raw, "analyze": os.path.join(out_dir, "books_clean.csv"),
+                      "plot": os.path.join(out_dir, "books_clean.csv")}
+            for stage in stages:
+                r = measure(stage, inputs[stage], out_dir if stage != "plot" else os.path.join(out_dir, "figures"), chunksize)
+                r.update(kind=kind, rows=rows, stage=stage, chunksize=chunksize)
+                if "seconds" in r:
+                    r["rows_per_sec"] = rows / r["seconds"] if r["seconds"] else None
+                results.append(r)
+                print(f"{kind:>5} {rows:>10,} {stage:<8} " +
+                      (f"{r['seconds']:8.2f}s  peak {r['peak_rss_mb']:8.1f} MB" if "seconds" in r else r["error"]))
+    return results
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_history(history, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp, path)
+
+def compare(history, entry, threshold):
+    """Print each stage against the latest earlier result for it on this host; return the regressions."""
+    previous = {}
+    for old in history:
+        if old["host"] != entry["host"]:
+            continue
+        for r in old["results"]:
+            if "seconds" in r:
+                previous[(r["kind"], r["rows"], r["stage"], r.get("chunksize"))] = (old, r)
+    regressions = []
+    for r in entry["results"]:
+        key = (r["kind"], r["rows"], r["stage"], r.get("chunksize"))
+        if "seconds" not in r or key not in previous:
+            continue
+        old, prev = previous[key]
+        change = r["seconds"] / prev["seconds"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{r['kind']:>5} {r['rows']:>10,} {r['stage']:<8} {change:+7.1%} time, "
+              f"{r['peak_rss_mb'] - prev['peak_rss_mb']:+8.1f} MB vs {(old['commit'] or '?')[:10]}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kinds", nargs="+", choices=sorted(KINDS), default=["books"])
+    ap.add_argument("--sizes", nargs="+", type=int, default=[1_000, 100_000], help="Row counts, e.g. 1000 100000 10000000")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    ap.add_argument("--chunksize", type=int, default=None, help="Run clean/analyze in chunked mode (needed for the largest sizes)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--messiness", type=float, default=0.1)
+    ap.add_argument("--workdir", default=os.path.join(Q2_ROOT, "benchmarks", "data"), help="Generated inputs are cached here")
+    ap.add_argument("--history", default=HISTORY)
+    ap.add_argument("--threshold", type=float, default=0.2, help="Flag stages slower than the previous run by this fraction")
+    ap.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any stage is flagged")
+    args = ap.parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+    import numpy as np, pandas as pd
+    commit, dirty = git_commit()
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit, "dirty": dirty,
+        "host": platform.node(), "python": platform.python_version(),
+        "numpy": np.__version__, "pandas": pd.__version__,
+        "results": run(args.kinds, args.sizes, args.stages, args.workdir, args.chunksize, args.seed, args.messiness),
+    }
+    history = load_history(args.history)
+    regressions = compare(history, entry, args.threshold)
+    save_history(history + [entry], args.history)
+    print("History ->", args.history)
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
@@ -0,0 +1,109 @@
+import os, sys, argparse
+import numpy as np
+import pandas as pd
+
+# Synthetic raw inputs for the benchmarks, shaped like books.csv (scraper) and
+# rss.csv (rss_collect). Rows carry the kind of mess cleaning.py has to handle:
+# stray/doubled whitespace, case and punctuation noise, currency symbols,
+# missing values, rating words vs digits, duplicate rows and dates in mixed
+# formats. Generation is vectorized and written in chunks, so 10M rows never
+# sit in memory at once. The same (kind, rows, seed, messiness) always gives
+# the same file.
+
+RATINGS = np.array(["One", "Two", "Three", "Four", "Five", "Zero", "4", ""])
+RATING_P = [0.18, 0.18, 0.2, 0.2, 0.18, 0.02, 0.02, 0.02]
+STOCK = np.array(["In stock", "  In stock (3 available) ", "Out of stock", "in stock"])
+STOCK_P = [0.85, 0.07, 0.05, 0.03]
+CURRENCY = np.array(["£", "$", "", "Â£"])
+CURRENCY_P = [0.85, 0.05, 0.07, 0.03]
+FEEDS = np.array([f"https://news.example.com/{s}/rss.xml" for s in
+                  ["world", "tech", "science", "business", "sport", "culture", "health", "politics"]])
+
+# Date formats seen in scraped/feed data; strftime is applied to a pool of
+# distinct timestamps once and rows index into it (real feeds repeat dates too)
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%b %d, %Y", "%Y-%m-%dT%H:%M:%S+00:00",
+                "%a, %d %b %Y %H:%M:%S GMT", "%Y-%m-%d %H:%M"]
+DATE_POOL = 5000
+
+def _messy_text(rng, text, messiness):
+    """Add whitespace, case and punctuation noise to a fraction of the rows."""
+    text = pd.Series(text, dtype=object)
+    n = len(text)
+    for pick, edit in [(rng.random(n) < messiness, lambda s: "  " + s + " "),
+                       (rng.random(n) < messiness, lambda s: s.str.replace(" ", "   ", n=1)),
+                       (rng.random(n) < messiness / 2, lambda s: s.str.upper()),
+                       (rng.random(n) < messiness / 2, lambda s: s + " !!"),
+                       (rng.random(n) < messiness / 4, lambda s: s + "\t\n")]:
+        if pick.any():
+            text[pick] = edit(text[pick])
+    return text
+
+def _dates(rng, n, messiness):
+    pool = pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365 * 24, DATE_POOL), unit="h")
+    table = np.array([pool.strftime(fmt) for fmt in DATE_FORMATS], dtype=object)
+    fmt = rng.choice(len(DATE_FORMATS), n, p=[0.4, 0.15, 0.1, 0.15, 0.15, 0.05])
+    out = table[fmt, rng.integers(0, DATE_POOL, n)]
+    out[rng.random(n) < messiness / 2] = ""
+    return out
+
+def _with_duplicates(rng, df, messiness):
+    """Replace a fraction of rows with copies of earlier rows of the chunk."""
+    n = len(df)
+    dup = np.flatnonzero(rng.random(n) < messiness / 2)
+    dup = dup[dup > 0]
+    if len(dup):
+        src = (rng.random(len(dup)) * dup).astype(np.int64)
+        df.iloc[dup] = df.iloc[src].to_numpy()
+    return df
+
+def synth_books(n, seed=0, start=0, messiness=0.1):
+    rng = np.random.default_rng([seed, start])
+    ids = np.arange(start, start + n).astype(str)
+    prices = pd.Series(rng.lognormal(3.3, 0.35, n).round(2)).astype(str).to_numpy(dtype=object)
+    prices = rng.choice(CURRENCY, n, p=CURRENCY_P).astype(object) + prices
+    prices[rng.random(n) < messiness / 2] = ""
+    df = pd.DataFrame({
+        "title": _messy_text(rng, "Book title number " + ids.astype(object), messiness),
+        "price": prices,
+        "stock": rng.choice(STOCK, n, p=STOCK_P),
+        "rating": rng.choice(RATINGS, n, p=RATING_P),
+        "url": "http://books.toscrape.com/catalogue/book_" + ids.astype(object) + "/index.html",
+        "published": _dates(rng, n, messiness),
+    })
+    return _with_duplicates(rng, df, messiness)
+
+def synth_rss(n, seed=0, start=0, messiness=0.1):
+    rng = np.random.default_rng([seed, start])
+    ids = np.arange(start, start + n).astype(str).astype(object)
+    feed = rng.choice(FEEDS, n)
+    words = np.array(["markets", "election", "storm", "study", "launch", "match", "vaccine", "budget"], dtype=object)
+    df = pd.DataFrame({
+        "feed": feed,
+        "title": _messy_text(rng, "Headline " + ids + ": " + rng.choice(words, n), messiness),
+        "summary": _messy_text(rng, "Summary of story " + ids + " about " + rng.choice(words, n) + ".", messiness),
+        "published": _dates(rng, n, messiness),
+        "link": feed.astype(object) + "/story/" + ids,
+    })
+    return _with_duplicates(rng, df, messiness)
+
+KINDS = {"books": synth_books, "rss": synth_rss}
+
+def write_synth(kind, rows, path, seed=0, messiness=0.1, chunk_rows=500_000):
+    """Write `rows` synthetic rows of `kind` to a CSV, one chunk at a time."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    for i, start in enumerate(range(0, rows, chunk_rows)):
+        chunk = KINDS[kind](min(chunk_rows, rows - start), seed, start, messiness)
+        chunk.to_csv(tmp, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    os.replace(tmp, path)
+    return path
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kind", choices=sorted(KINDS), default="books")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--out", required=True, help="CSV path to write")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--messiness", type=float, default=0.1, help="Rough fraction of rows given each kind of noise")
+    args = ap.parse_args()
+    print("Wrote", write_synth(args.kind, args.rows, args.out, args.seed, args.messiness))
@@ -0,0 +1,135 @@
+import os, time, json, resource, threading, tracemalloc
+from contextlib import contextmanager
+
+# Shared timing/counter layer for the Q2 scripts. Each script starts one
+# Recorder for its stage (scrape, rss, clean, analyze, plot); code anywhere in
+# the stage times steps with `recorder().step(name, rows)` and bumps counters
+# with `recorder().add(name, n)`, without threading the recorder through every
+# call. Steps with the same name (per page, per chunk) are aggregated. Safe to
+# use from worker threads; each process has its own recorder.
+#
+# `profiled(stage, profile_dir)` wraps a whole run: with a profile_dir it also
+# enables cProfile and tracemalloc and writes <stage>.pstats and
+# <stage>_trace.json (Chrome trace format, viewable in Perfetto or
+# chrome://tracing) there. tracemalloc slows Python allocations noticeably,
+# so it is only on when profiling; peak RSS is always reported.
+
+MAX_EVENTS = 10_000
+
+class Recorder:
+    def __init__(self, stage, trace_memory=False):
+        self.stage = stage
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.steps, self.counters, self.events = {}, {}, []
+        self.lock = threading.Lock()
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def step(self, name, rows=None):
+        """Time a block; `rows` (or rows set on the yielded dict) feeds rows/sec."""
+        info = {"rows": rows}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self._record(name, start, time.perf_counter() - start, info["rows"])
+
+    def _record(self, name, start, seconds, rows):
+        with self.lock:
+            s = self.steps.setdefault(name, {"seconds": 0.0, "calls": 0, "rows": 0})
+            s["seconds"] += seconds
+            s["calls"] += 1
+            s["rows"] += rows or 0
+            if len(self.events) < MAX_EVENTS:
+                self.events.append((name, start - self.t0, seconds, rows, threading.get_ident()))
+
+    def add(self, counter, n=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def timing(self):
+        """The "timing" section of the stage's report."""
+        with self.lock:
+            steps = {name: dict(s, rows_per_sec=s["rows"] / s["seconds"] if s["rows"] and s["seconds"] else None)
+                     for name, s in self.steps.items()}
+            counters = dict(self.counters)
+        memory = {"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+        if self.trace_memory and tracemalloc.is_tracing():
+            memory["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        return {"stage": self.stage, "total_seconds": time.perf_counter() - self.t0,
+                "steps": steps, "counters": counters, "memory": memory}
+
+    def write_trace(self, path):
+        pid = os.getpid()
+        with self.lock:
+            events = [{"name": name, "ph": "X", "pid": pid, "tid": tid, "ts": start * 1e6, "dur": seconds * 1e6,
+                       "args": {} if rows is None else {"rows": rows}}
+                      for name, start, seconds, rows, tid in self.events]
+        trace = {"traceEvents": events, "displayTimeUnit": "ms",
+                 "otherData": dict(self.timing(), started_at=self.started_at)}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, indent=1)
+
+    def summary_line(self):
+        t = self.timing()
+        counters = ", ".join(f"{k}={v:,}" for k, v in sorted(t["counters"].items()))
+        return (f"[{self.stage}] {t['total_seconds']:.2f}s, peak RSS {t['memory']['peak_rss_mb']:.0f} MB"
+                + (f", {counters}" if counters else ""))
+
+def merge_timings(stage, timings, total_seconds):
+    """One "timing" section from several recorders' (e.g. one per pool job).
+
+    Step seconds, calls and rows and the counters are summed, so step seconds
+    can exceed `total_seconds`, the caller's wall clock. Memory is the largest
+    peak seen.
+    """
+    steps, counters, memory = {}, {}, {}
+    for t in timings:
+        for name, s in t["steps"].items():
+            acc = steps.setdefault(name, {"seconds": 0.0, "calls": 0, "rows": 0})
+            for key in acc:
+                acc[key] += s[key]
+        for name, n in t["counters"].items():
+            counters[name] = counters.get(name, 0) + n
+        for name, mb in t["memory"].items():
+            memory[name] = max(memory.get(name, 0.0), mb)
+    for s in steps.values():
+        s["rows_per_sec"] = s["rows"] / s["seconds"] if s["rows"] and s["seconds"] else None
+    return {"stage": stage, "total_seconds": total_seconds, "steps": steps, "counters": counters, "memory": memory}
+
+_active = Recorder("default")
+
+def recorder():
+    return _active
+
+def start(stage, trace_memory=False):
+    """Replace this process's recorder with a fresh one for `stage`."""
+    global _active
+    _active = Recorder(stage, trace_memory)
+    return _active
+
+@contextmanager
+def profiled(stage, profile_dir=None):
+    """Record a whole stage run; with `profile_dir`, also dump pstats + JSON trace there."""
+    rec = start(stage, trace_memory=bool(profile_dir))
+    prof = None
+    if profile_dir:
+        import cProfile
+        os.makedirs(profile_dir, exist_ok=True)
+        prof = cProfile.Profile()
+        prof.enable()
+    try:
+        with rec.step(stage):
+            yield rec
+    finally:
+        if prof is not None:
+            prof.disable()
+            prof.dump_stats(os.path.join(profile_dir, f"{stage}.pstats"))
+            rec.write_trace(os.path.join(profile_dir, f"{stage}_trace.json"))
+            print("Profile ->", os.path.join(profile_dir, f"{stage}.pstats"), "+", f"{stage}_trace.json")
+        print(rec.summary_line())
+        if rec.trace_memory:
+            tracemalloc.stop()
@@ -0,0 +1,192 @@
+import os
+import pandas as pd
+
+# Explicit column types for the two Q2 datasets. CSV keeps the historical
+# text layout; typed formats (Parquet, Feather/Arrow IPC) store these types so
+# downstream stages don't re-infer them. Text columns stay object/str.
+BOOKS_SCHEMA = {
+    "price": "float64",
+    "rating_num": "float64",
+    "stock_count": "Int64",
+}
+RSS_SCHEMA = {
+    "published": "datetime64[ns, UTC]",
+}
+SCHEMAS = {"books": BOOKS_SCHEMA, "rss": RSS_SCHEMA}
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".feather": "feather", ".arrow": "feather"}
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+def table_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported table format {ext!r} ({path}); use one of {sorted(FORMATS)}")
+    return FORMATS[ext]
+
+def detect_dataset(df):
+    if "feed" in df.columns:
+        return "rss"
+    if "price" in df.columns or "rating" in df.columns:
+        return "books"
+    return None
+
+def apply_schema(df, dataset=None):
+    schema = SCHEMAS.get(dataset or detect_dataset(df), {})
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype.startswith("datetime64"):
+            df[col] = pd.to_datetime(df[col], utc=True, errors="coerce", format="ISO8601")
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    return df
+
+def read_table(path, columns=None, dataset=None):
+    """Load a stage table from CSV, Parquet or Feather (memory-mapped)."""
+    fmt = table_format(path)
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    import pyarrow.feather as feather
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+def write_table(df, path, dataset=None):
+    """Write a stage table; typed formats get the dataset schema applied first."""
+    fmt = table_format(path)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return path
+    df = apply_schema(df.copy(), dataset)
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+    return path
+
+def table_columns(path):
+    """Column names without reading the data."""
+    fmt = table_format(path)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    import pyarrow as pa
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema.names
+
+def csv_text_columns(path, chunksize, columns=None):
+    """CSV columns that read as text in at least one chunk of `chunksize` rows.
+
+    read_csv types each chunk on its own, so such a column can come back as
+    numbers (or all-NaN floats) in other chunks, while the whole file reads it
+    as text. Reading these columns with dtype=str keeps every chunk typed as
+    the whole file is. Costs one extra parse of the file.
+    """
+    text = set()
+    for df in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+        text.update(c for c in df.columns if pd.api.types.is_object_dtype(df[c].dtype)
+                    or pd.api.types.is_string_dtype(df[c].dtype))
+    return sorted(text)
+
+def iter_table_chunks(path, chunksize, columns=None, start=0, dtype=None):
+    """Yield DataFrames of at most `chunksize` rows without loading the whole table.
+
+    The index keeps counting across chunks, as with pd.read_csv(chunksize=...).
+    Rows before `start` are skipped (their index numbers are kept). `dtype`
+    is passed to read_csv (CSV only; the other formats are typed already).
+    """
+    fmt = table_format(path)
+    if fmt == "csv":
+        skip = range(1, start + 1) if start else None
+        for df in pd.read_csv(path, usecols=columns, chunksize=chunksize, skiprows=skip, dtype=dtype):
+            if start:
+                df.index = df.index + start
+            yield df
+        return
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        import pyarrow.feather as feather
+        batches = feather.read_table(path, columns=columns, memory_map=True).to_batches(max_chunksize=chunksize)
+    offset = 0
+    for batch in batches:
+        if offset + batch.num_rows <= start:
+            offset += batch.num_rows
+            continue
+        df = batch.slice(max(start - offset, 0)).to_pandas()
+        first = max(start, offset)
+        df.index = pd.RangeIndex(first, first + len(df))
+        offset += batch.num_rows
+        yield df
+
+class TableWriter:
+    """Append DataFrame chunks to one CSV, Parquet or Feather (Arrow IPC) file.
+
+    The Arrow schema is fixed by the first chunk. Text (object/str) columns are
+    always strings, and so are columns with no values yet that the dataset
+    schema doesn't type, since a chunk of empty cells says nothing about the
+    rest. Later chunks are converted to that schema column by column; a column
+    that can't be raises ValueError naming it.
+    """
+    def __init__(self, path, dataset=None):
+        self.path, self.dataset = path, dataset
+        self.fmt = table_format(path)
+        self.writer = self.schema = None
+        self.rows = 0
+
+    def _first_schema(self, df):
+        import pyarrow as pa
+        typed = SCHEMAS.get(self.dataset or detect_dataset(df), {})
+        fields = []
+        for name in df.columns:
+            col = df[name]
+            text = pd.api.types.is_object_dtype(col.dtype) or pd.api.types.is_string_dtype(col.dtype)
+            if text or (name not in typed and col.isna().all() and not pd.api.types.is_datetime64_any_dtype(col.dtype)):
+                fields.append(pa.field(str(name), pa.string()))
+            else:
+                fields.append(pa.Schema.from_pandas(df[[name]], preserve_index=False).field(str(name)))
+        return pa.schema(fields)
+
+    def _to_table(self, df):
+        import pyarrow as pa
+        if list(map(str, df.columns)) != self.schema.names:
+            raise ValueError(f"{self.path}: chunk at row {self.rows} has columns {list(df.columns)}, "
+                             f"expected {self.schema.names}")
+        arrays = []
+        for field, name in zip(self.schema, df.columns):
+            col = df[name]
+            if col.isna().all():
+                arrays.append(pa.nulls(len(col), field.type))
+                continue
+            try:
+                arrays.append(pa.Array.from_pandas(col, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"{self.path}: column {name!r} in chunk at row {self.rows} is {col.dtype}, "
+                                 f"which doesn't fit the file's {field.type} ({e})") from None
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, index=False, mode="a" if self.rows else "w", header=not self.rows)
+            self.rows += len(df)
+            return
+        import pyarrow as pa
+        df = apply_schema(df.copy(), self.dataset)
+        if self.writer is None:
+            self.schema = self._first_schema(df)
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                self.writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.path, self.schema)
+        self.writer.write_table(self._to_table(df))
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        elif self.rows == 0 and self.fmt == "csv":
+            open(self.path, "w").close()
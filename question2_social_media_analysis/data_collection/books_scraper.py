@@ -1,72 +1,232 @@
-import os, time, csv, argparse, sys
-from urllib.parse import urljoin
-import requests
-from bs4 import BeautifulSoup
+import os, re, time, json, argparse, sys, threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_collection.incremental import PageCache, fetch_conditional, merge_csv
+from data_collection.parsers import parse_book, page_links, get_engine
+from data_collection.sinks import RowSink
+from common.instrumentation import recorder, profiled
 
 BASE = "http://books.toscrape.com/"
+FIELDS = ["title", "price", "stock", "rating", "url"]
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests/sec with bursts up to `burst`."""
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class HostRateLimiter:
+    """One token bucket per host, created lazily."""
+    def __init__(self, rate, burst=1):
+        self.rate, self.burst = rate, burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
 
-def fetch(url, session, retries=3, backoff=1.5):
+def fetch(url, session, retries=3, backoff=1.5, limiter=None, headers=None):
     for attempt in range(retries):
+        if limiter is not None:
+            limiter.wait(url)
         try:
-            resp = session.get(url, timeout=15)
+            with recorder().step("fetch"):
+                resp = session.get(url, timeout=15, headers=headers)
             resp.raise_for_status()
+            recorder().add("requests")
+            recorder().add("bytes_fetched", len(resp.content))
             return resp
         except Exception as e:
             if attempt == retries - 1:
                 raise
             time.sleep(backoff * (attempt + 1))
 
-def parse_book(card, base_url):
-    title = card.h3.a["title"].strip()
-    rel_url = card.h3.a["href"]
-    price = card.select_one(".price_color").text.strip().replace("£","")
-    stock = card.select_one(".availability").text.strip()
-    rating = card.select_one(".star-rating")["class"]
-    rating_value = next((r for r in rating if r != "star-rating"), "Zero")
-    detail_url = urljoin(base_url, rel_url)
-    return {
-        "title": title,
-        "price": price,
-        "stock": stock,
-        "rating": rating_value,
-        "url": detail_url
-    }
-
-def scrape_books(outdir):
-    os.makedirs(outdir, exist_ok=True)
-    session = requests.Session()
-    url = BASE
-    rows = []
-    page_num = 1
+NEXT_RE = re.compile(r'<li class="next">\s*<a href="([^"]+)"')
+PAGER_RE = re.compile(r'<li class="current">\s*Page\s+\d+\s+of\s+(\d+)')
+
+def page_links_raw(html):
+    """Cheap regex version of page_links for cached pages we don't re-parse."""
+    m_next, m_pager = NEXT_RE.search(html), PAGER_RE.search(html)
+    return (m_next.group(1) if m_next else None), (int(m_pager.group(1)) if m_pager else None)
+
+def discover_pages(url, next_href, total):
+    """Derive every remaining catalogue page URL from the pager ("Page 1 of 50") and the next link."""
+    if not next_href or not total:
+        return None
+    tmpl = re.search(r"page-(\d+)\.html", next_href)
+    if not tmpl:
+        return None
+    next_url = urljoin(url, next_href)
+    return [re.sub(r"page-\d+\.html", f"page-{n}.html", next_url) for n in range(int(tmpl.group(1)), total + 1)]
+
+def scrape_page(url, session, limiter=None, cache=None, engine="bs4"):
+    """Fetch and parse one listing page.
+
+    Returns (rows, (next_href, total_pages)). With a cache, unchanged pages
+    are not parsed and `rows` is None.
+    """
+    if cache is not None:
+        body, changed, encoding = fetch_conditional(
+            url, session, cache, lambda u, s, headers: fetch(u, s, headers=headers, limiter=limiter))
+        if not changed:
+            return None, page_links_raw(body.decode(encoding or "utf-8", "replace"))
+    else:
+        resp = fetch(url, session, limiter=limiter)
+        body, encoding = resp.content, resp.encoding
+    with recorder().step("parse") as step:
+        rows, links = get_engine(engine)(body, url, encoding)
+        step["rows"] = len(rows)
+    return rows, links
+
+def crawl_sequential(session, base_url=BASE, delay=1.0, cache=None, engine="bs4", start=0):
+    """Yield (page_index, url, rows, next_url) following "next" links from `base_url`."""
+    url = base_url
+    page = start
     while True:
-        print(f"Scraping page {page_num}: {url}")
-        resp = fetch(url, session)
-        soup = BeautifulSoup(resp.text, "lxml")
-        for card in soup.select(".product_pod"):
-            rows.append(parse_book(card, url))
-        next_link = soup.select_one("li.next > a")
-        if not next_link:
+        print(f"Scraping page {page + 1}: {url}")
+        page_rows, (next_href, _) = scrape_page(url, session, cache=cache, engine=engine)
+        next_url = urljoin(url, next_href) if next_href else None
+        yield page, url, page_rows, next_url
+        if not next_url:
             break
-        url = urljoin(url, next_link["href"])
-        page_num += 1
-        time.sleep(1.0)  # be nice
-    # Save CSV & JSON
+        url = next_url
+        page += 1
+        time.sleep(delay)  # be nice
+
+def crawl_concurrent(session, base_url=BASE, concurrency=8, rate=2.0, burst=1, cache=None, engine="bs4", start=0,
+                     start_url=None):
+    """Fetch all catalogue pages with a bounded thread pool.
+
+    Page URLs are discovered from the first page's pager, fetched concurrently
+    under a per-host token bucket, and pages are yielded in catalogue order as
+    (page_index, url, rows, next_url). Pages before `start` are not fetched
+    (except page 1, which is needed to plan the crawl). Without a pager the
+    crawl follows "next" links instead, from `start_url` (the URL of page
+    `start`, e.g. from a checkpoint) when given.
+    """
+    limiter = HostRateLimiter(rate, burst)
+    print(f"Scraping page 1: {base_url}")
+    rows, (next_href, total) = scrape_page(base_url, session, limiter, cache, engine)
+    next_url = urljoin(base_url, next_href) if next_href else None
+    urls = discover_pages(base_url, next_href, total)
+    if start == 0:
+        yield 0, base_url, rows, next_url
+    if urls is None:
+        # No pager to plan from: fall back to following "next" links
+        if start > 0 and start_url:
+            yield from crawl_sequential(session, start_url, 1.0 / rate, cache, engine, start=start)
+        elif next_url:
+            # Page `start` can only be reached by walking the pages before it
+            pages = crawl_sequential(session, next_url, 1.0 / rate, cache, engine, start=1)
+            yield from (p for p in pages if p[0] >= start)
+        return
+    print(f"Discovered {len(urls) + 1} pages, fetching with concurrency={concurrency}, rate={rate}/s")
+    first = max(start, 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # map() yields in submission order, so pages keep catalogue order
+        results = pool.map(lambda u: scrape_page(u, session, limiter, cache, engine), urls[first - 1:])
+        for page, (url, (page_rows, _)) in enumerate(zip(urls[first - 1:], results), start=first):
+            yield page, url, page_rows, (urls[page] if page < len(urls) else None)
+
+def scrape_books(outdir, base_url=BASE, concurrency=1, rate=2.0, cache_path=None, engine="bs4",
+                 resume=False, flush_every=500):
+    """Crawl the catalogue into books.csv + books.jsonl.
+
+    Full crawls stream rows to disk page by page (constant memory) and keep a
+    checkpoint, so `resume=True` continues an interrupted crawl from the last
+    flushed page. With a page cache the run is incremental instead: only the
+    rows of changed pages are parsed and merged into the existing files.
+    """
+    import requests
+    os.makedirs(outdir, exist_ok=True)
+    session = requests.Session()
+    cache = PageCache(cache_path) if cache_path else None
     csv_path = os.path.join(outdir, "books.csv")
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
-    import json
-    with open(os.path.join(outdir, "books.json"), "w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(rows)} records to {csv_path}")
+    jsonl_path = os.path.join(outdir, "books.jsonl")
+    sink = None
+    if cache is None:
+        sink = RowSink(csv_path, jsonl_path, FIELDS, flush_every,
+                       checkpoint_path=os.path.join(outdir, "books.checkpoint.json"), resume=resume)
+    start, url = 0, base_url
+    if sink is not None and sink.state:
+        start, url = sink.state["pages_done"], sink.state["next_url"]
+        print(f"Resuming after page {start} ({sink.count} records already saved)")
+        if url is None:
+            sink.close()
+            print(f"Crawl already complete: {sink.count} records in {csv_path}")
+            return
+    if concurrency > 1:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        pages = crawl_concurrent(session, base_url, concurrency, rate, cache=cache, engine=engine, start=start,
+                                 start_url=url)
+    else:
+        pages = crawl_sequential(session, url, cache=cache, engine=engine, start=start)
+    if cache is not None:
+        # Incremental run: only rows from changed pages were parsed; fold them into books.csv
+        changed = [r for _, _, page_rows, _ in pages if page_rows is not None for r in page_rows]
+        rows = merge_csv(csv_path, changed, key=["url"], fieldnames=FIELDS)
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        cache.commit()
+        recorder().add("cache_hits", cache.hits)
+        recorder().add("cache_misses", cache.misses)
+        print(f"Merged {len(changed)} changed records ({cache.hits} pages unchanged, {cache.misses} changed); {len(rows)} records in {csv_path}")
+        cache.close()
+        return
+    with sink:
+        for page, _, page_rows, next_url in pages:
+            with recorder().step("write", rows=len(page_rows)):
+                sink.write(page_rows)
+                sink.commit({"pages_done": page + 1, "next_url": next_url}, force=next_url is None)
+            recorder().add("pages")
+    print(f"Saved {sink.count} records to {csv_path}")
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--out", default="data/books", help="Output directory")
+    ap.add_argument("--base-url", default=BASE, help="Catalogue root (e.g. a local mirror)")
+    ap.add_argument("--concurrency", type=int, default=1, help="Concurrent page fetches (1 = sequential crawl)")
+    ap.add_argument("--rate", type=float, default=2.0, help="Max requests/sec per host in concurrent mode")
+    ap.add_argument("--cache", default=None, help="Page cache (SQLite) path; enables incremental re-crawls")
+    ap.add_argument("--resume", action="store_true", help="Continue an interrupted crawl from its checkpoint")
+    ap.add_argument("--flush-every", type=int, default=500, help="Flush + checkpoint after this many rows")
+    ap.add_argument("--engine", default="bs4", choices=["bs4", "lxml"], help="Listing parser backend")
+    ap.add_argument("--enrich", action="store_true", help="Also fetch detail pages (category, UPC, description, stock count)")
+    ap.add_argument("--profile", action="store_true", help="Write scrape.pstats + scrape_trace.json to --out")
     args = ap.parse_args()
     try:
-        scrape_books(args.out)
+        with profiled("scrape", args.out if args.profile else None):
+            scrape_books(args.out, args.base_url, args.concurrency, args.rate, args.cache, args.engine,
+                         args.resume, args.flush_every)
+            if args.enrich:
+                from data_collection.enrich_books import enrich
+                with recorder().step("enrich"):
+                    enrich(os.path.join(args.out, "books.csv"), args.out, fetch_workers=max(args.concurrency, 1), rate=args.rate)
     except Exception as e:
         print("ERROR:", e, file=sys.stderr)
         sys.exit(1)
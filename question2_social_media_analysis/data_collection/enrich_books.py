@@ -0,0 +1,98 @@
+import os, re, sys, csv, json, argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_collection.books_scraper import fetch, HostRateLimiter
+
+DETAIL_FIELDS = ["category", "upc", "description", "stock_count"]
+
+def parse_detail(html):
+    """Parse a book detail page into the fields the listing card lacks."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "lxml")
+    crumbs = soup.select("ul.breadcrumb li a")
+    desc = soup.select_one("#product_description ~ p")
+    info = {tr.th.text.strip(): tr.td.text.strip() for tr in soup.select("table tr") if tr.th and tr.td}
+    m = re.search(r"\((\d+) available\)", info.get("Availability", ""))
+    return {
+        "category": crumbs[2].text.strip() if len(crumbs) > 2 else "",
+        "upc": info.get("UPC", ""),
+        "description": desc.text.strip() if desc else "",
+        "stock_count": int(m.group(1)) if m else "",
+    }
+
+def _parse_item(item):
+    url, html = item
+    return dict(parse_detail(html), url=url)
+
+def load_done(progress_path):
+    """Detail records already fetched by a previous (possibly interrupted) run."""
+    done = {}
+    if os.path.exists(progress_path):
+        with open(progress_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # torn last line from an interrupted write
+                done[rec["url"]] = rec
+    return done
+
+def enrich(input_csv, out_dir, fetch_workers=8, parse_workers=None, rate=4.0, batch=64):
+    """Follow each listing `url` to its detail page and add category/UPC/description/stock_count.
+
+    Pages are fetched through one pooled session by a bounded thread pool and
+    parsed in a process pool. Every parsed page is appended to
+    detail_pages.jsonl, so a rerun resumes without refetching finished pages.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with open(input_csv, newline="", encoding="utf-8") as f:
+        books = list(csv.DictReader(f))
+    progress_path = os.path.join(out_dir, "detail_pages.jsonl")
+    done = load_done(progress_path)
+    todo = [b["url"] for b in books if b["url"] not in done]
+    print(f"Enriching {len(books)} books: {len(done)} already done, {len(todo)} to fetch")
+
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=fetch_workers, pool_maxsize=fetch_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    limiter = HostRateLimiter(rate)
+    get_html = lambda u: (u, fetch(u, session, limiter=limiter).text)
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, \
+            ProcessPoolExecutor(max_workers=parse_workers) as parsers, \
+            open(progress_path, "a", encoding="utf-8") as progress:
+        # Work in batches so only `batch` pages are held in memory at once
+        for start in range(0, len(todo), batch):
+            pages = list(fetchers.map(get_html, todo[start:start + batch]))
+            for rec in parsers.map(_parse_item, pages):
+                progress.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                done[rec["url"]] = rec
+            progress.flush()
+            print(f"  {min(start + batch, len(todo))}/{len(todo)} detail pages")
+
+    out_csv = os.path.join(out_dir, "books_enriched.csv")
+    fields = list(books[0].keys()) + [c for c in DETAIL_FIELDS if c not in books[0]] if books else DETAIL_FIELDS
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for b in books:
+            writer.writerow(dict(b, **{k: done[b["url"]][k] for k in DETAIL_FIELDS}))
+    print(f"Saved {len(books)} enriched records to {out_csv}")
+    return out_csv
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", default="data/books/books.csv", help="books.csv from books_scraper")
+    ap.add_argument("--out", default="data/books", help="Output directory")
+    ap.add_argument("--fetch-workers", type=int, default=8, help="Concurrent detail-page fetches")
+    ap.add_argument("--parse-workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    ap.add_argument("--rate", type=float, default=4.0, help="Max requests/sec per host")
+    args = ap.parse_args()
+    try:
+        enrich(args.input, args.out, args.fetch_workers, args.parse_workers, args.rate)
+    except Exception as e:
+        print("ERROR:", e, file=sys.stderr)
+        sys.exit(1)
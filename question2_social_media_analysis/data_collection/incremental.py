@@ -0,0 +1,111 @@
+import os, csv, hashlib, sqlite3, threading, time
+
+
+class PageCache:
+    """On-disk page/feed cache keyed by URL (SQLite).
+
+    Stores ETag/Last-Modified validators, a SHA-256 of the body and the body
+    itself. New entries are staged in memory and only written by `commit()`,
+    which callers run after the rows parsed from those pages are saved, so a
+    crash never leaves the cache ahead of the CSV.
+    """
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, sha256 TEXT, body BLOB, fetched_at REAL)"
+        )
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, sha256, body FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "sha256": row[2], "body": row[3]}
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def stage(self, url, etag, last_modified, body):
+        with self.lock:
+            self.pending[url] = (url, etag, last_modified, sha256(body), body, time.time())
+
+    def commit(self):
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)", list(self.pending.values())
+                )
+            self.pending.clear()
+
+    def close(self):
+        self.conn.close()
+
+
+def sha256(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def fetch_conditional(url, session, cache, fetch):
+    """Fetch `url` with cached validators.
+
+    Returns (body_bytes, changed, encoding). `changed` is False when the
+    server answers 304 or the body hash matches the cached copy, in which case
+    callers can skip parsing entirely. `encoding` is what requests would use
+    for `resp.text`, so decoded output matches an uncached fetch.
+    """
+    entry = cache.get(url)
+    resp = fetch(url, session, headers=cache.conditional_headers(entry))
+    if resp.status_code == 304 and entry is not None:
+        cache.hits += 1
+        return entry["body"], False, resp.encoding
+    body = resp.content
+    if entry is not None and entry["sha256"] == sha256(body):
+        cache.hits += 1
+        # Refresh validators only; the body is unchanged
+        cache.stage(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), body)
+        return body, False, resp.encoding
+    cache.misses += 1
+    cache.stage(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), body)
+    return body, True, resp.encoding
+
+
+def merge_csv(path, rows, key, fieldnames=None):
+    """Merge `rows` into the CSV at `path`, replacing rows with the same key.
+
+    Existing rows keep their position; new keys are appended. The file is
+    rewritten atomically. Returns the merged rows.
+    """
+    keyfn = lambda r: tuple(r.get(k, "") for k in key)
+    merged = {}
+    fields = list(fieldnames or [])
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fields = list(reader.fieldnames or []) + [c for c in fields if c not in (reader.fieldnames or [])]
+            for r in reader:
+                merged[keyfn(r)] = r
+    for r in rows:
+        for c in r:
+            if c not in fields:
+                fields.append(c)
+        merged[keyfn(r)] = r
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(merged.values())
+    os.replace(tmp, path)
+    return list(merged.values())
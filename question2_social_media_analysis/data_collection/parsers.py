@@ -0,0 +1,86 @@
+import re
+from functools import lru_cache
+from urllib.parse import urljoin
+
+# Listing-page parser backends. Each engine takes the raw response bytes, the
+# page URL and the encoding requests would use for `resp.text`, and returns
+# (rows, (next_href, total_pages)). "bs4" is the reference implementation;
+# other engines must produce identical rows (see benchmarks/bench_parsers.py).
+# bs4 and lxml are imported by the engine that uses them, on first call.
+
+def parse_book(card, base_url):
+    title = card.h3.a["title"].strip()
+    rel_url = card.h3.a["href"]
+    price = card.select_one(".price_color").text.strip().replace("£","")
+    stock = card.select_one(".availability").text.strip()
+    rating = card.select_one(".star-rating")["class"]
+    rating_value = next((r for r in rating if r != "star-rating"), "Zero")
+    detail_url = urljoin(base_url, rel_url)
+    return {
+        "title": title,
+        "price": price,
+        "stock": stock,
+        "rating": rating_value,
+        "url": detail_url
+    }
+
+def page_links(soup):
+    """Return (next_href, total_pages) from a parsed listing page."""
+    next_link = soup.select_one("li.next > a")
+    current = soup.select_one("li.current")
+    m = re.search(r"of\s+(\d+)", current.text) if current else None
+    return (next_link["href"] if next_link else None), (int(m.group(1)) if m else None)
+
+def parse_listing_bs4(content, url, encoding=None):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content.decode(encoding or "utf-8", "replace"), "lxml")
+    return [parse_book(card, url) for card in soup.select(".product_pod")], page_links(soup)
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# XPath mirroring the CSS lookups in parse_book/page_links, compiled once
+XPATHS = {
+    "cards": f"//*[{_has_class('product_pod')}]",
+    "link": "((.//h3)[1]//a)[1]",
+    "price": f"(.//*[{_has_class('price_color')}])[1]",
+    "stock": f"(.//*[{_has_class('availability')}])[1]",
+    "rating": f"(.//*[{_has_class('star-rating')}])[1]/@class",
+    "next": f"(//li[{_has_class('next')}]/a)[1]/@href",
+    "current": f"(//li[{_has_class('current')}])[1]",
+}
+
+@lru_cache(maxsize=None)
+def _xpath(name):
+    from lxml import etree
+    return etree.XPath(XPATHS[name])
+
+def parse_listing_lxml(content, url, encoding=None):
+    """Direct lxml/XPath engine: parses the response bytes, no str decode."""
+    import lxml.html
+    parser = lxml.html.HTMLParser(encoding=encoding or "utf-8")
+    doc = lxml.html.fromstring(content, parser=parser)
+    x_link, x_price, x_stock, x_rating = _xpath("link"), _xpath("price"), _xpath("stock"), _xpath("rating")
+    rows = []
+    for card in _xpath("cards")(doc):
+        link = x_link(card)[0]
+        rating = x_rating(card)[0].split()
+        rows.append({
+            "title": link.get("title").strip(),
+            "price": x_price(card)[0].text_content().strip().replace("£",""),
+            "stock": x_stock(card)[0].text_content().strip(),
+            "rating": next((r for r in rating if r != "star-rating"), "Zero"),
+            "url": urljoin(url, link.get("href")),
+        })
+    next_href = _xpath("next")(doc)
+    current = _xpath("current")(doc)
+    m = re.search(r"of\s+(\d+)", current[0].text_content()) if current else None
+    return rows, ((next_href[0] if next_href else None), (int(m.group(1)) if m else None))
+
+ENGINES = {"bs4": parse_listing_bs4, "lxml": parse_listing_lxml}
+
+def get_engine(name):
+    if name not in ENGINES:
+        raise ValueError(f"Unknown parser engine {name!r}; choose from {sorted(ENGINES)}")
+    return ENGINES[name]
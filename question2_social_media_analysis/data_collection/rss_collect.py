@@ -1,33 +1,95 @@
-import os, argparse, csv, time
-import feedparser
+import os, sys, json, argparse, time
 
-def collect_rss(feeds, out_csv):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_collection.incremental import PageCache, fetch_conditional, merge_csv
+from data_collection.sinks import RowSink
+from common.instrumentation import recorder, profiled
+
+FIELDS = ["feed", "title", "summary", "published", "link"]
+DEFAULT_FEEDS = [
+    "https://news.ycombinator.com/rss",
+    "https://www.reddit.com/r/books/.rss"
+]
+
+def fetch_feed(url, session, headers=None):
+    with recorder().step("fetch"):
+        resp = session.get(url, timeout=15, headers=headers)
+    resp.raise_for_status()
+    recorder().add("requests")
+    recorder().add("bytes_fetched", len(resp.content))
+    return resp
+
+def feed_rows(url, d):
+    return [{
+        "feed": url,
+        "title": getattr(e, "title", ""),
+        "summary": getattr(e, "summary", ""),
+        "published": getattr(e, "published", ""),
+        "link": getattr(e, "link", ""),
+    } for e in d.entries]
+
+def collect_rss(feeds, out_csv, cache_path=None, resume=False, flush_every=500):
+    """Collect feed items into `out_csv` (+ a .jsonl twin).
+
+    Items are streamed to disk feed by feed with a checkpoint, so `resume=True`
+    skips feeds finished by an interrupted run. With a feed cache the run is
+    incremental instead: unchanged feeds are skipped and changed items merged.
+    """
+    import feedparser
+    os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
+    if cache_path:
+        return collect_rss_incremental(feeds, out_csv, cache_path)
+    sink = RowSink(out_csv, os.path.splitext(out_csv)[0] + ".jsonl", FIELDS, flush_every,
+                   checkpoint_path=out_csv + ".checkpoint.json", resume=resume)
+    done = sink.state["feeds_done"] if sink.state else 0
+    if done:
+        print(f"Resuming after {done} feeds ({sink.count} items already saved)")
+    with sink:
+        for i, url in enumerate(feeds[done:], start=done):
+            print("Reading feed:", url)
+            with recorder().step("feed") as step:
+                rows = feed_rows(url, feedparser.parse(url))
+                step["rows"] = len(rows)
+            with recorder().step("write", rows=len(rows)):
+                sink.write(rows)
+                sink.commit({"feeds_done": i + 1}, force=i + 1 == len(feeds))
+            time.sleep(0.5)
+    print("Saved", sink.count, "RSS items to", out_csv)
+
+def collect_rss_incremental(feeds, out_csv, cache_path):
+    import requests, feedparser
+    session = requests.Session()
+    cache = PageCache(cache_path)
     rows = []
     for url in feeds:
         print("Reading feed:", url)
-        d = feedparser.parse(url)
-        for e in d.entries:
-            rows.append({
-                "feed": url,
-                "title": getattr(e, "title", ""),
-                "summary": getattr(e, "summary", ""),
-                "published": getattr(e, "published", ""),
-                "link": getattr(e, "link", ""),
-            })
+        body, changed, _ = fetch_conditional(url, session, cache, fetch_feed)
+        if changed:
+            with recorder().step("parse") as step:
+                new = feed_rows(url, feedparser.parse(body))
+                step["rows"] = len(new)
+            rows.extend(new)
+        else:
+            print("  unchanged, skipping")
         time.sleep(0.5)
-    os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
-    with open(out_csv, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys() if rows else ["feed","title","summary","published","link"])
-        writer.writeheader()
-        writer.writerows(rows)
-    print("Saved", len(rows), "RSS items to", out_csv)
+    merged = merge_csv(out_csv, rows, key=["feed", "link"], fieldnames=FIELDS)
+    with open(os.path.splitext(out_csv)[0] + ".jsonl", "w", encoding="utf-8") as f:
+        for r in merged:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    cache.commit()
+    recorder().add("cache_hits", cache.hits)
+    recorder().add("cache_misses", cache.misses)
+    cache.close()
+    print("Merged", len(rows), "changed RSS items;", len(merged), "items in", out_csv)
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("--feeds", nargs="+", default=[
-        "https://news.ycombinator.com/rss",
-        "https://www.reddit.com/r/books/.rss"
-    ])
+    ap.add_argument("--feeds", nargs="+", default=DEFAULT_FEEDS)
     ap.add_argument("--out", default="data/rss/rss_items.csv")
+    ap.add_argument("--cache", default=None, help="Feed cache (SQLite) path; enables incremental re-collection")
+    ap.add_argument("--resume", action="store_true", help="Skip feeds finished by an interrupted run")
+    ap.add_argument("--flush-every", type=int, default=500, help="Flush + checkpoint after this many items")
+    ap.add_argument("--profile", action="store_true", help="Write rss.pstats + rss_trace.json next to --out")
     args = ap.parse_args()
-    collect_rss(args.feeds, args.out)
+    with profiled("rss", (os.path.dirname(args.out) or ".") if args.profile else None):
+        collect_rss(args.feeds, args.out, args.cache, args.resume, args.flush_every)
@@ -0,0 +1,96 @@
+import os, sys, csv, json
+
+
+class RowSink:
+    """Stream rows to CSV and JSON Lines as they are produced.
+
+    Rows are written immediately; files are flushed and a checkpoint is saved
+    at unit boundaries (a listing page, a feed) once `flush_every` rows are
+    pending. The checkpoint stores the caller's resume state together with the
+    byte offsets of both files, so `resume=True` truncates any rows written
+    after the last checkpoint and appends from there. If an output file is
+    missing or shorter than its checkpointed offset, the checkpoint no longer
+    describes what is on disk: the run starts over with a warning.
+    """
+    def __init__(self, csv_path, jsonl_path=None, fieldnames=None, flush_every=500,
+                 checkpoint_path=None, resume=False):
+        self.csv_path, self.jsonl_path = csv_path, jsonl_path
+        self.fieldnames = list(fieldnames)
+        self.flush_every = flush_every
+        self.checkpoint_path = checkpoint_path
+        self.state, self.count, self.pending = None, 0, 0
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+        saved = self._load_checkpoint() if resume else None
+        if saved is not None and not self._outputs_match(saved["offsets"]):
+            print(f"WARNING: {checkpoint_path} does not match the output files (missing or shorter than checkpointed); "
+                  "starting over from the first row", file=sys.stderr)
+            saved = None
+        if saved is not None:
+            self.state, self.count = saved["state"], saved["rows"]
+            os.truncate(csv_path, saved["offsets"]["csv"])
+            if jsonl_path:
+                os.truncate(jsonl_path, saved["offsets"]["jsonl"])
+        mode = "a" if saved is not None else "w"
+        self.csv_file = open(csv_path, mode, newline="", encoding="utf-8")
+        self.jsonl_file = open(jsonl_path, mode, encoding="utf-8") if jsonl_path else None
+        self.writer = csv.DictWriter(self.csv_file, fieldnames=self.fieldnames)
+        if saved is None:
+            self.writer.writeheader()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _outputs_match(self, offsets):
+        paths = {"csv": self.csv_path, "jsonl": self.jsonl_path}
+        return all(os.path.exists(paths[k]) and os.path.getsize(paths[k]) >= offsets[k]
+                   for k in offsets if paths[k])
+
+    def write(self, rows):
+        for r in rows:
+            self.writer.writerow(r)
+            if self.jsonl_file:
+                self.jsonl_file.write(json.dumps(r, ensure_ascii=False) + "\n")
+        self.count += len(rows)
+        self.pending += len(rows)
+
+    def commit(self, state, force=False):
+        """Mark a unit boundary; flush + checkpoint when enough rows are pending."""
+        self.state = state
+        if force or self.pending >= self.flush_every:
+            self.flush()
+
+    def flush(self, checkpoint=True):
+        self.csv_file.flush()
+        offsets = {"csv": self.csv_file.tell()}
+        if self.jsonl_file:
+            self.jsonl_file.flush()
+            offsets["jsonl"] = self.jsonl_file.tell()
+        self.pending = 0
+        if checkpoint and self.checkpoint_path and self.state is not None:
+            tmp = self.checkpoint_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"state": self.state, "rows": self.count, "offsets": offsets}, f)
+            os.replace(tmp, self.checkpoint_path)
+
+    def close(self, complete=True):
+        """Close the files; a completed run removes its checkpoint.
+
+        An incomplete run leaves the last checkpoint untouched: rows written
+        after it belong to an unfinished unit and are truncated on resume.
+        """
+        self.flush(checkpoint=False)
+        self.csv_file.close()
+        if self.jsonl_file:
+            self.jsonl_file.close()
+        if complete and self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # On error keep the checkpoint (pointing at the last completed unit)
+        self.close(complete=exc_type is None)
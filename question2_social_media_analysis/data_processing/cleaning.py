@@ -1,31 +1,158 @@
-import os, re, argparse
+import os, re, sys, glob, json, time, argparse, threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
 from dateutil import parser as dateparser
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.tables import (read_table, write_table, iter_table_chunks, table_columns, detect_dataset,
+                           csv_text_columns, table_format, TableWriter, EXTENSIONS, FORMATS)
+from common import instrumentation
+from common.instrumentation import recorder, profiled, merge_timings
+
+WS_RE = re.compile(r"\s+")
+STRIP_RE = re.compile(r"[^\w\s\-\.\,£$%:/]")
+STRIP_RUN_RE = re.compile(r"[^\w\s\-\.\,£$%:/]+")
+# Matches every string normalize_text would change (and possibly a few more):
+# edge whitespace, any whitespace other than a single space, disallowed chars.
+DIRTY_RE = re.compile(r"^\s|\s$|[^\S ]|\s\s|[^\w\s\-\.\,£$%:/]")
+
 def normalize_text(s: str) -> str:
     if not isinstance(s, str):
         return s
     s = s.replace("\n", " ").strip()
-    s = re.sub(r"\s+", " ", s)
-    s = re.sub(r"[^\w\s\-\.\,£$%:/]", "", s)
+    s = WS_RE.sub(" ", s)
+    s = STRIP_RE.sub("", s)
     return s
 
+def is_text_column(col: pd.Series) -> bool:
+    return col.dtype == object or isinstance(col.dtype, pd.StringDtype)
+
+def normalize_series(col: pd.Series) -> pd.Series:
+    """Vectorized normalize_text over a column; output is identical per cell.
+
+    Each distinct string is normalized once, and only if DIRTY_RE flags it,
+    so already-clean columns cost a single regex scan. Whitespace collapsing
+    uses str.split() (same character set as `\\s` on stripped text) and the
+    character filter runs as one .str.replace with a compiled pattern, which
+    keeps Python `re` semantics even for Arrow-backed string columns.
+    """
+    obj = col.astype(object)
+    if pd.api.types.infer_dtype(obj, skipna=True) == "string":
+        is_str = obj.notna()
+    else:
+        is_str = obj.map(lambda v: isinstance(v, str)).astype(bool)
+    codes, uniques = pd.factorize(obj[is_str])
+    uniques = pd.Series(uniques, dtype=object)
+    dirty = uniques.str.contains(DIRTY_RE).astype(bool)
+    if not dirty.any():
+        return col
+    collapsed = pd.Series([" ".join(v.split()) for v in uniques[dirty]], index=uniques.index[dirty], dtype=object)
+    uniques[dirty] = collapsed.str.replace(STRIP_RUN_RE, "", regex=True)
+    obj = obj.copy()
+    obj[is_str] = uniques.to_numpy()[codes]
+    return obj.astype(col.dtype) if isinstance(col.dtype, pd.StringDtype) else obj
+
 def standardize_date(s: str):
     try:
         return dateparser.parse(s).isoformat()
     except Exception:
         return None
 
-def main(input_csv, out_dir):
-    os.makedirs(out_dir, exist_ok=True)
-    df = pd.read_csv(input_csv)
-    # Basic cleaning
+# Fast-path formats (RFC 822 and ISO 8601 variants common in feeds). Each one
+# yields exactly what dateutil would for strings it matches; anything else
+# falls through to standardize_date.
+DATE_FORMATS = [
+    ("%a, %d %b %Y %H:%M:%S %z", None),
+    ("%a, %d %b %Y %H:%M:%S GMT", timezone.utc),
+    ("%a, %d %b %Y %H:%M:%S UTC", timezone.utc),
+    ("%d %b %Y %H:%M:%S %z", None),
+    ("%Y-%m-%dT%H:%M:%S%z", None),
+    ("%Y-%m-%dT%H:%M:%S.%f%z", None),
+    ("%Y-%m-%dT%H:%M:%S", None),
+    ("%Y-%m-%d %H:%M:%S", None),
+    ("%Y-%m-%d", None),
+]
+
+def parse_date_fast(s: str):
+    for fmt, tz in DATE_FORMATS:
+        try:
+            dt = datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+        return (dt.replace(tzinfo=tz) if tz else dt).isoformat()
+    return None
+
+class DateCache:
+    """Bounded LRU memo of raw string -> ISO result, shared across columns/chunks.
+
+    Locked, since the pipeline runner's thread workers share DATE_CACHE.
+    """
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                return True, self.data[key]
+        return False, None
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+DATE_CACHE = DateCache()
+
+def standardize_dates(col: pd.Series, counts=None, cache=DATE_CACHE) -> pd.Series:
+    """Tiered standardize_date over a column.
+
+    Distinct values are resolved once: first from the LRU cache, then by the
+    strptime fast paths, and only the residue by dateutil. `counts` (a dict)
+    accumulates how many cells each tier handled: "fast_path", "cache"
+    (duplicates and LRU hits), "dateutil", and "failed".
+    """
+    counts = counts if counts is not None else {}
+    for tier in ("fast_path", "cache", "dateutil", "failed"):
+        counts.setdefault(tier, 0)
+    codes, uniques = pd.factorize(col.astype(object), use_na_sentinel=True)
+    results = []
+    for u in uniques:
+        hit, iso = cache.get(u)
+        if hit:
+            tier = "cache"
+        else:
+            iso = parse_date_fast(u) if isinstance(u, str) else None
+            tier = "fast_path"
+            if iso is None:
+                iso = standardize_date(u)
+                tier = "dateutil" if iso is not None else "failed"
+            cache.put(u, iso)
+        results.append((iso, tier))
+    per_code = pd.Series(codes).value_counts()
+    for code, n in per_code.items():
+        if code < 0:
+            counts["failed"] += int(n)  # missing values standardize to None
+            continue
+        tier = results[code][1]
+        counts[tier] += 1
+        counts["cache"] += int(n) - 1
+    values = [r[0] for r in results] + [None]
+    return pd.Series(pd.array(values, dtype=object)[codes], index=col.index, dtype=object)
+
+def normalize_frame(df):
     for col in df.columns:
-        if df[col].dtype == object:
-            df[col] = df[col].map(normalize_text)
-    # Duplicates
-    before = len(df)
-    df = df.drop_duplicates()
+        if is_text_column(df[col]):
+            df[col] = normalize_series(df[col])
+    return df
+
+def convert_frame(df, date_tiers):
+    """Type conversions applied after de-duplication: price, rating_num, dates."""
     # Convert price to float (handle currency symbols if present)
     if "price" in df.columns:
         df["price"] = df["price"].astype(str).str.replace("£","", regex=False).str.replace("$","", regex=False)
@@ -36,27 +163,285 @@ def main(input_csv, out_dir):
         df["rating_num"] = df["rating"].map(rating_map).fillna(pd.to_numeric(df["rating"], errors="coerce"))
     # Dates standardization if exist
     for col in df.columns:
-        if "date" in col.lower() or col.lower() in {"published"}:
-            df[col] = df[col].map(standardize_date)
+        if ("date" in col.lower() or col.lower() in {"published"}) and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = standardize_dates(df[col], date_tiers.setdefault(col, {}))
+    return df
+
+def clean_frame(df):
+    """Clean one in-memory table; returns (clean_df, report)."""
+    rec = recorder()
+    # Basic cleaning
+    with rec.step("normalize", rows=len(df)):
+        df = normalize_frame(df)
+    # Duplicates
+    before = len(df)
+    with rec.step("dedupe", rows=before):
+        df = df.drop_duplicates()
+    date_tiers = {}
+    with rec.step("convert", rows=len(df)):
+        df = convert_frame(df, date_tiers)
     # Quality checks
-    after = len(df)
     report = {
         "rows_before": before,
-        "rows_after": after,
-        "null_counts": df.isna().sum().to_dict()
+        "rows_after": len(df),
+        "null_counts": df.isna().sum().to_dict(),
+        "date_parsing": date_tiers,
     }
+    return df, report
+
+NA_DIGEST = pd.util.hash_array(np.array(["\x00NA"], dtype=object))[0]
+
+def row_digests(df):
+    """64-bit digest per row, stable across chunks whose dtypes were inferred separately.
+
+    Numeric columns hash as float64 and everything else by its text. Missing
+    cells all hash to one value whatever the column's dtype (drop_duplicates
+    treats NaN/None as equal, and a text column with no values in one chunk
+    reads as float64). clean_chunked reads CSV text columns as str in every
+    chunk, so a value never hashes as a number in one chunk and as text in
+    another. Two rows collide by chance with probability ~n^2 / 2^65.
+    """
+    parts = {}
+    for c in df.columns:
+        col = df[c]
+        missing = col.isna().to_numpy()
+        if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+            digests = pd.util.hash_array(col.to_numpy(dtype="float64", na_value=np.nan))
+        else:
+            digests = pd.util.hash_array(col.astype(object).where(~missing, "").astype(str).to_numpy(dtype=object))
+        digests[missing] = NA_DIGEST
+        parts[c] = digests
+    return pd.util.hash_pandas_object(pd.DataFrame(parts), index=False).to_numpy()
+
+class DigestSet:
+    """Set of row digests kept in memory up to a byte budget, then spilled to SQLite."""
+    BYTES_PER_DIGEST = 80  # int object + set slot, roughly
+
+    def __init__(self, memory_budget_mb=256, spill_dir=None):
+        self.limit = max(1, int(memory_budget_mb * 2**20 / self.BYTES_PER_DIGEST))
+        self.spill_dir = spill_dir
+        self.mem = set()
+        self.db = None
+
+    def _spill(self):
+        import sqlite3, tempfile
+        fd, self.db_path = tempfile.mkstemp(suffix=".sqlite", dir=self.spill_dir)
+        os.close(fd)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("CREATE TABLE digests (d INTEGER PRIMARY KEY)")
+        self._insert(self.mem)
+        self.mem = set()
+
+    def _insert(self, digests):
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO digests VALUES (?)", ((d,) for d in digests))
+
+    def add_new(self, digests):
+        """Add a chunk's digests; return a mask of rows not seen before (first wins)."""
+        signed = digests.view("int64")  # SQLite integers are signed 64-bit
+        fresh = ~pd.Series(signed).duplicated().to_numpy()
+        if self.db is None:
+            fresh &= np.fromiter((d not in self.mem for d in signed.tolist()), dtype=bool, count=len(signed))
+            self.mem.update(signed[fresh].tolist())
+            if len(self.mem) > self.limit:
+                self._spill()
+            return fresh
+        candidates = signed[fresh].tolist()
+        seen = set()
+        for i in range(0, len(candidates), 500):
+            part = candidates[i:i + 500]
+            q = "SELECT d FROM digests WHERE d IN (%s)" % ",".join("?" * len(part))
+            seen.update(r[0] for r in self.db.execute(q, part))
+        fresh &= np.fromiter((d not in seen for d in signed.tolist()), dtype=bool, count=len(signed))
+        self._insert(signed[fresh].tolist())
+        return fresh
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            os.remove(self.db_path)
+
+def clean_chunked(input_path, out_path, chunksize, memory_budget_mb=256):
+    """Out-of-core clean_frame: stream chunks, de-duplicate across chunks, append output.
+
+    Produces the same report as clean_frame (null counts and date tiers are
+    accumulated per chunk); peak memory is one chunk plus the digest set,
+    which spills to disk beyond `memory_budget_mb`.
+    """
+    rec = recorder()
+    dtype = None
+    if table_format(input_path) == "csv":
+        # Type each column as a whole-file read would, the same in every chunk
+        with rec.step("scan_types"):
+            dtype = dict.fromkeys(csv_text_columns(input_path, chunksize), str)
+    seen = DigestSet(memory_budget_mb, spill_dir=os.path.dirname(out_path) or None)
+    writer = TableWriter(out_path)
+    before, null_counts, date_tiers = 0, {}, {}
+    try:
+        for chunk in iter_table_chunks(input_path, chunksize, dtype=dtype):
+            with rec.step("normalize", rows=len(chunk)):
+                chunk = normalize_frame(chunk)
+            before += len(chunk)
+            with rec.step("dedupe", rows=len(chunk)):
+                chunk = chunk[seen.add_new(row_digests(chunk))]
+            with rec.step("convert", rows=len(chunk)):
+                chunk = convert_frame(chunk.copy(), date_tiers)
+            for col, n in chunk.isna().sum().items():
+                null_counts[col] = null_counts.get(col, 0) + int(n)
+            with rec.step("write", rows=len(chunk)):
+                writer.write(chunk)
+    finally:
+        writer.close()
+        seen.close()
+    report = {
+        "rows_before": before,
+        "rows_after": writer.rows,
+        "null_counts": null_counts,
+        "date_parsing": date_tiers,
+    }
+    return out_path, report
+
+def clean_file(input_path, out_dir, fmt="csv", chunksize=None, memory_budget_mb=256):
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, "books_clean" + EXTENSIONS[fmt])
+    if chunksize:
+        df_out, report = clean_chunked(input_path, out_path, chunksize, memory_budget_mb)
+    else:
+        with recorder().step("read") as step:
+            df = read_table(input_path)
+            step["rows"] = len(df)
+        df, report = clean_frame(df)
+        with recorder().step("write", rows=len(df)):
+            df_out = write_table(df, out_path)
+    report["timing"] = recorder().timing()
     report_path = os.path.join(out_dir, "cleaning_report.json")
-    df_out = os.path.join(out_dir, "books_clean.csv")
-    df.to_csv(df_out, index=False)
-    import json
     with open(report_path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2)
     print("Saved cleaned data to", df_out)
     print("Cleaning report ->", report_path)
+    return df_out, report
+
+def expand_inputs(spec):
+    """A file, a directory of tables, or a glob -> sorted list of input paths."""
+    if os.path.isdir(spec):
+        paths = [os.path.join(dp, f) for dp, _, fs in os.walk(spec) for f in fs
+                 if os.path.splitext(f)[1].lower() in FORMATS]
+    else:
+        paths = glob.glob(spec, recursive=True) if glob.has_magic(spec) else [spec]
+    return sorted(paths)
+
+def source_names(paths):
+    """Unique, filesystem-safe names per input, from the path below their common directory.
+
+    The extension is dropped unless that would merge two inputs (a.csv and
+    a.parquet keep theirs); names equal but for case, which some filesystems
+    can't keep apart, get a numeric suffix.
+    """
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    rel = [os.path.relpath(os.path.abspath(p), root).replace(os.sep, "__") for p in paths]
+    stems = [os.path.splitext(r)[0] for r in rel]
+    counts = Counter(stems)
+    names, taken = [], set()
+    for r, stem in zip(rel, stems):
+        name = stem if counts[stem] == 1 else r
+        unique, n = name, 1
+        while unique.lower() in taken:
+            n += 1
+            unique = f"{name}-{n}"
+        taken.add(unique.lower())
+        names.append(unique)
+    return names
+
+def _clean_job(job):
+    input_path, out_dir, fmt, chunksize, memory_budget_mb, partition_path, kind = job
+    # Fresh recorder per job: pool processes are reused across files
+    instrumentation.start("clean:" + os.path.basename(out_dir))
+    out_path, report = clean_file(input_path, out_dir, fmt, chunksize, memory_budget_mb)
+    if partition_path:
+        # One partition of the combined dataset, copied chunk by chunk
+        os.makedirs(os.path.dirname(partition_path), exist_ok=True)
+        writer = TableWriter(partition_path, dataset=kind)
+        for chunk in iter_table_chunks(out_path, chunksize or 100_000):
+            writer.write(chunk)
+        writer.close()
+    return report
+
+def merge_reports(reports):
+    total = {"files": len(reports), "rows_before": 0, "rows_after": 0, "null_counts": {}, "date_parsing": {}}
+    for r in reports.values():
+        total["rows_before"] += r["rows_before"]
+        total["rows_after"] += r["rows_after"]
+        for col, n in r["null_counts"].items():
+            total["null_counts"][col] = total["null_counts"].get(col, 0) + n
+        for col, tiers in r.get("date_parsing", {}).items():
+            acc = total["date_parsing"].setdefault(col, {})
+            for tier, n in tiers.items():
+                acc[tier] = acc.get(tier, 0) + n
+    return total
+
+def dataset_kinds(paths):
+    """Dataset kind per input ("books", "rss" or "other") from its columns.
+
+    Raises ValueError if two inputs of one kind have different columns: their
+    partitions couldn't share a schema in the combined dataset.
+    """
+    kinds, columns = [], {}
+    for path in paths:
+        cols = table_columns(path)
+        kind = detect_dataset(pd.DataFrame(columns=cols)) or "other"
+        first = columns.setdefault(kind, (path, cols))
+        if sorted(first[1]) != sorted(cols):
+            raise ValueError(f"--concat needs one column layout per dataset kind; {first[0]} and {path} "
+                             f"are both {kind} but have columns {first[1]} vs {cols}")
+        kinds.append(kind)
+    return kinds
+
+def clean_many(paths, out_dir, fmt="csv", chunksize=None, memory_budget_mb=256, workers=None, concat=False):
+    """Clean many inputs across a process pool.
+
+    Each input gets its own subdirectory (cleaned table + cleaning_report.json);
+    cleaning_summary.json holds every per-file report plus merged totals. With
+    `concat`, the outputs are also written as Hive-partitioned Parquet, one
+    dataset per kind so books and RSS schemas never mix:
+    combined/<kind>/source=<name>/part-0.parquet.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    start = time.perf_counter()
+    names = source_names(paths)
+    kinds = dataset_kinds(paths) if concat else [None] * len(paths)
+    jobs = [(p, os.path.join(out_dir, name), fmt, chunksize, memory_budget_mb,
+             os.path.join(out_dir, "combined", kind, f"source={name}", "part-0.parquet") if concat else None, kind)
+            for p, name, kind in zip(paths, names, kinds)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        reports = dict(zip(names, pool.map(_clean_job, jobs)))
+    # The work happened in the pool's recorders; this process only waited
+    timing = merge_timings("clean", [r["timing"] for r in reports.values()], time.perf_counter() - start)
+    summary = {"totals": merge_reports(reports), "per_file": reports, "timing": timing}
+    summary_path = os.path.join(out_dir, "cleaning_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Cleaned {len(paths)} files; summary -> {summary_path}")
+    return summary
+
+def main(input_csv, out_dir, fmt="csv", chunksize=None, memory_budget_mb=256, workers=None, concat=False):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = expand_inputs(input_csv)
+    if not paths:
+        raise FileNotFoundError(f"No input tables match {input_csv!r}")
+    if len(paths) == 1 and not (os.path.isdir(input_csv) or glob.has_magic(input_csv)):
+        return clean_file(paths[0], out_dir, fmt, chunksize, memory_budget_mb)[1]
+    return clean_many(paths, out_dir, fmt, chunksize, memory_budget_mb, workers, concat)
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True, help="Input CSV path")
+    ap.add_argument("--input", required=True, help="Input table (.csv, .parquet or .feather), a directory of them, or a glob")
     ap.add_argument("--out", default="data/clean", help="Output directory")
+    ap.add_argument("--format", default="csv", choices=sorted(EXTENSIONS), help="Output table format")
+    ap.add_argument("--chunksize", type=int, default=None, help="Stream the input in chunks of this many rows")
+    ap.add_argument("--memory-budget", type=float, default=256, help="MB of row digests kept in memory before spilling to disk (chunked mode)")
+    ap.add_argument("--workers", type=int, default=None, help="Processes for multi-file inputs (default: CPU count)")
+    ap.add_argument("--concat", action="store_true", help="Also write the cleaned outputs as partitioned Parquet, one dataset per kind (combined/<kind>/)")
+    ap.add_argument("--profile", action="store_true", help="Write clean.pstats + clean_trace.json to --out")
     args = ap.parse_args()
-    main(args.input, args.out)
+    with profiled("clean", args.out if args.profile else None):
+        main(args.input, args.out, args.format, args.chunksize, args.memory_budget, args.workers, args.concat)
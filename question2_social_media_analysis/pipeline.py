@@ -0,0 +1,232 @@
+import os, sys, json, time, hashlib, argparse, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.instrumentation import recorder, profiled
+
+# One entry point for collect -> clean -> analyze -> plot, run as a DAG:
+#
+#   books.collect -> books.clean -> books.analyze
+#                               \-> books.plot
+#   rss.collect   -> rss.clean
+#
+# Stages hand DataFrames to each other in memory, and every output is also
+# written under --out as usual. Each stage's key is a hash of its params and
+# its inputs' content hashes, kept in pipeline_manifest.json. If the key
+# matches and the artifacts still exist, the stage is skipped and its output
+# is read back from disk only when a downstream stage needs it. Collect
+# stages always run, since their input is the network; the scraper and feed
+# caches make that cheap. Their output hash is what lets the rest of the
+# graph skip. Code changes are not tracked, so use --force after editing a
+# stage.
+#
+# Independent stages run in parallel on a thread pool: the two branches, and
+# analyze vs plot. Threads rather than processes keep the handoff zero-copy;
+# pandas/NumPy release the GIL for much of the heavy lifting.
+
+def frame_hash(df):
+    import pandas as pd
+    h = hashlib.sha256(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def value_hash(value):
+    import pandas as pd
+    if isinstance(value, pd.DataFrame):
+        return frame_hash(value)
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+class Stage:
+    """A pipeline node: func(*dep_values) -> (value, artifact_paths).
+
+    `load()` rebuilds the value from the artifacts of a skipped run; stages
+    with `cacheable=False` always run.
+    """
+    def __init__(self, name, func, deps=(), params=None, load=None, cacheable=True):
+        self.name, self.func, self.deps = name, func, tuple(deps)
+        self.params = params or {}
+        self.load = load
+        self.cacheable = cacheable
+
+class Output:
+    """A finished stage's value (loaded lazily if the stage was skipped) and content hash."""
+    def __init__(self, value=None, digest=None, load=None, skipped=False):
+        self.value, self.digest, self.load, self.skipped = value, digest, load, skipped
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.value is None and self.load is not None:
+                self.value = self.load()
+            return self.value
+
+class Pipeline:
+    def __init__(self, stages, manifest_path, workers=4, force=False):
+        self.stages = {s.name: s for s in stages}
+        self.manifest_path = manifest_path
+        self.workers, self.force = workers, force
+        self.manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self.outputs = {}
+        self.lock = threading.Lock()
+
+    def stage_key(self, stage):
+        inputs = [self.outputs[d].digest for d in stage.deps]
+        return hashlib.sha256(json.dumps({"stage": stage.name, "params": stage.params, "inputs": inputs},
+                                         sort_keys=True, default=str).encode()).hexdigest()
+
+    def run_stage(self, stage):
+        key = self.stage_key(stage)
+        entry = self.manifest.get(stage.name)
+        if (stage.cacheable and not self.force and entry and entry["key"] == key
+                and all(os.path.exists(p) for p in entry["artifacts"])):
+            print(f"[{stage.name}] inputs unchanged, skipping")
+            return Output(digest=entry["output_hash"], load=stage.load, skipped=True)
+        print(f"[{stage.name}] running")
+        start = time.perf_counter()
+        with recorder().step(stage.name):
+            value, artifacts = stage.func(*[self.outputs[d].get() for d in stage.deps])
+        digest = value_hash(value)
+        with self.lock:
+            self.manifest[stage.name] = {"key": key, "output_hash": digest, "artifacts": artifacts,
+                                         "seconds": time.perf_counter() - start}
+            self._save_manifest()
+        return Output(value, digest)
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def run(self):
+        """Run every stage once its dependencies are done; returns {name: Output}."""
+        pending = dict(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(d in self.outputs for d in stage.deps):
+                        running[pool.submit(self.run_stage, stage)] = name
+                        del pending[name]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # A failed stage raises here; stages already running finish first
+                    self.outputs[running.pop(future)] = future.result()
+        return self.outputs
+
+def read_table(path):
+    from common.tables import read_table
+    return read_table(path)
+
+def file_table(path):
+    df = read_table(path)
+    return df, [path]
+
+def clean_stage(path, report_path):
+    from data_processing.cleaning import clean_frame
+    from common.tables import write_table
+    def run(raw):
+        df, report = clean_frame(raw.copy())
+        # Downstream stages see the table as if re-read from the cleaned file
+        df = df.reset_index(drop=True)
+        write_table(df, path)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return df, [path, report_path]
+    return run
+
+def analyze_stage(path, **options):
+    from analysis.stats import analyze
+    def run(df):
+        results = analyze(df, **options)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        return results, [path]
+    return run
+
+def plot_stage(out_dir):
+    from visualizations.plots import render
+    def run(df):
+        render(df, out_dir)
+        return None, sorted(os.path.join(out_dir, f) for f in os.listdir(out_dir))
+    return run
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def build_stages(out_dir, books_url=None, feeds=None, collect=True, branches=("books", "rss"),
+                 concurrency=4, rate=2.0, resamples=0, seed=None):
+    paths = {
+        "books_raw": os.path.join(out_dir, "raw", "books", "books.csv"),
+        "books_clean": os.path.join(out_dir, "clean", "books", "books_clean.csv"),
+        "books_report": os.path.join(out_dir, "clean", "books", "cleaning_report.json"),
+        "books_summary": os.path.join(out_dir, "reports", "books", "analysis_summary.json"),
+        "books_figures": os.path.join(out_dir, "reports", "books", "figures"),
+        "rss_raw": os.path.join(out_dir, "raw", "rss", "rss_items.csv"),
+        "rss_clean": os.path.join(out_dir, "clean", "rss", "rss_clean.csv"),
+        "rss_report": os.path.join(out_dir, "clean", "rss", "cleaning_report.json"),
+    }
+    for p in paths.values():
+        os.makedirs(p if p.endswith("figures") else os.path.dirname(p), exist_ok=True)
+    stages = []
+    if "books" in branches:
+        def collect_books():
+            if collect:
+                from data_collection.books_scraper import scrape_books, BASE
+                raw_dir = os.path.dirname(paths["books_raw"])
+                scrape_books(raw_dir, books_url or BASE, concurrency, rate, cache_path=os.path.join(raw_dir, "pages.sqlite"))
+            return file_table(paths["books_raw"])
+        analyze_options = {"resamples": resamples, "seed": seed}
+        stages += [
+            Stage("books.collect", collect_books, cacheable=False),
+            Stage("books.clean", clean_stage(paths["books_clean"], paths["books_report"]), ["books.collect"],
+                  load=lambda: read_table(paths["books_clean"])),
+            Stage("books.analyze", analyze_stage(paths["books_summary"], **analyze_options), ["books.clean"],
+                  params=analyze_options, load=lambda: load_json(paths["books_summary"])),
+            Stage("books.plot", plot_stage(paths["books_figures"]), ["books.clean"]),
+        ]
+    if "rss" in branches:
+        def collect_feeds():
+            if collect:
+                from data_collection.rss_collect import collect_rss, DEFAULT_FEEDS
+                raw_dir = os.path.dirname(paths["rss_raw"])
+                collect_rss(feeds or DEFAULT_FEEDS, paths["rss_raw"], cache_path=os.path.join(raw_dir, "feeds.sqlite"))
+            return file_table(paths["rss_raw"])
+        stages += [
+            Stage("rss.collect", collect_feeds, cacheable=False),
+            Stage("rss.clean", clean_stage(paths["rss_clean"], paths["rss_report"]), ["rss.collect"],
+                  load=lambda: read_table(paths["rss_clean"])),
+        ]
+    return stages
+
+def main(out_dir, books_url=None, feeds=None, collect=True, branches=("books", "rss"), workers=4,
+         force=False, concurrency=4, rate=2.0, resamples=0, seed=None):
+    os.makedirs(out_dir, exist_ok=True)
+    stages = build_stages(out_dir, books_url, feeds, collect, branches, concurrency, rate, resamples, seed)
+    outputs = Pipeline(stages, os.path.join(out_dir, "pipeline_manifest.json"), workers, force).run()
+    ran = [n for n, o in outputs.items() if not o.skipped]
+    print(f"Pipeline done: {len(ran)} stages ran, {len(outputs) - len(ran)} skipped")
+    return outputs
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="data/pipeline", help="Root for raw/, clean/ and reports/")
+    ap.add_argument("--branches", nargs="+", choices=["books", "rss"], default=["books", "rss"])
+    ap.add_argument("--books-url", default=None, help="Catalogue root (e.g. a local mirror)")
+    ap.add_argument("--feeds", nargs="+", default=None)
+    ap.add_argument("--no-collect", action="store_true", help="Use the raw files already under --out/raw")
+    ap.add_argument("--concurrency", type=int, default=4, help="Concurrent page fetches for the scraper")
+    ap.add_argument("--rate", type=float, default=2.0, help="Max requests/sec per host")
+    ap.add_argument("--resamples", type=int, default=0, help="Permutation/bootstrap tests in the analysis stage")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=4, help="Stages run in parallel")
+    ap.add_argument("--force", action="store_true", help="Re-run every stage even if its inputs are unchanged")
+    ap.add_argument("--profile", action="store_true", help="Write pipeline.pstats + pipeline_trace.json to --out")
+    args = ap.parse_args()
+    with profiled("pipeline", args.out if args.profile else None):
+        main(args.out, args.books_url, args.feeds, not args.no_collect, args.branches, args.workers,
+             args.force, args.concurrency, args.rate, args.resamples, args.seed)
@@ -1,79 +1,198 @@
-import os, argparse
-import pandas as pd
+import os, sys, json, argparse
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
+
+# Non-interactive backend for everything that renders here (workers inherit it)
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.instrumentation import recorder, profiled
+from analysis.regression import LinearFit
+
+# Figures are drawn with the object-oriented API (Figure -> Agg canvas), never
+# pyplot, so there is no global figure state: each figure is an independent
+# job that can render in a thread or a worker process. Above `max_points`
+# rows the scatter switches to a hexbin (PNG) and a WebGL scatter of a
+# density-preserving sample (HTML). The trend line and its confidence band come
+# from one LinearFit (analysis/regression.py), fitted up front or taken from
+# stats.py's analysis_summary.json, and both outputs draw that same fit.
+
+MAX_POINTS = 50_000
 
 def ensure_dir(d):
     os.makedirs(d, exist_ok=True)
 
-def hist_box(df, outdir):
+def new_figure(**kwargs):
+    # matplotlib is only imported once a figure is actually drawn
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
+
+def save(fig, outdir, name):
+    fig.savefig(os.path.join(outdir, name))
+
+def hist_box(df, outdir, **_):
     ensure_dir(outdir)
     if "price" in df:
+        price = df["price"].dropna().to_numpy()
         # Histogram
-        plt.figure()
-        df["price"].dropna().plot(kind="hist", bins=30)
-        plt.title("Price Distribution")
-        plt.xlabel("Price")
-        plt.ylabel("Frequency")
-        plt.savefig(os.path.join(outdir, "price_hist.png"))
-        plt.close()
+        fig = new_figure()
+        ax = fig.subplots()
+        ax.hist(price, bins=30)
+        ax.set_title("Price Distribution")
+        ax.set_xlabel("Price")
+        ax.set_ylabel("Frequency")
+        save(fig, outdir, "price_hist.png")
 
         # Boxplot
-        plt.figure()
-        df["price"].dropna().plot(kind="box")
-        plt.title("Price Boxplot")
-        plt.savefig(os.path.join(outdir, "price_box.png"))
-        plt.close()
+        fig = new_figure()
+        ax = fig.subplots()
+        ax.boxplot(price)
+        ax.set_xticks([1], ["price"])
+        ax.set_title("Price Boxplot")
+        save(fig, outdir, "price_box.png")
+
+def downsample(x, y, n, bins=100, seed=0):
+    """Indices of ~n points sampled in proportion to local density on a bins x bins grid.
 
-def scatter_trend(df, outdir):
+    Every occupied cell keeps at least one point, so sparse regions and
+    outliers stay visible while dense regions keep their relative weight.
+    """
+    if len(x) <= n:
+        return np.arange(len(x))
+    def cell(v):
+        lo, hi = np.nanmin(v), np.nanmax(v)
+        return np.minimum(((v - lo) / ((hi - lo) or 1) * bins).astype(np.int64), bins - 1)
+    cells = cell(x) * bins + cell(y)
+    counts = np.bincount(cells, minlength=bins * bins)
+    quota = np.maximum(1, np.round(counts * (n / len(x)))).astype(np.int64)
+    # Random order within each cell, then keep each cell's first `quota` points
+    order = np.lexsort((np.random.default_rng(seed).random(len(x)), cells))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(len(x)) - starts[cells[order]]
+    return np.sort(order[rank < quota[cells[order]]])
+
+def scatter_trend(df, outdir, trend=None, max_points=MAX_POINTS):
     if not {"price", "rating_num"} <= set(df.columns):
         return
     ensure_dir(outdir)
-    # Matplotlib scatter
-    plt.figure()
-    plt.scatter(df["rating_num"], df["price"])
-    plt.title("Rating vs Price")
-    plt.xlabel("Rating")
-    plt.ylabel("Price")
-    # Trend line
-    x = df["rating_num"].dropna().values
-    y = df["price"].dropna().values[:len(x)]
-    if len(x) > 1:
-        coeffs = np.polyfit(x[:len(y)], y, 1)
-        line_x = np.linspace(min(x), max(x), 100)
-        line_y = coeffs[0]*line_x + coeffs[1]
-        plt.plot(line_x, line_y)
-    plt.savefig(os.path.join(outdir, "rating_vs_price_scatter.png"))
-    plt.close()
-
-    # Plotly interactive
-    fig = px.scatter(df, x="rating_num", y="price", hover_data=["title"] if "title" in df else None, trendline="ols")
+    x, y = df["rating_num"].to_numpy(dtype=float, na_value=np.nan), df["price"].to_numpy(dtype=float, na_value=np.nan)
+    large = len(df) > max_points
+    ok = np.flatnonzero(~np.isnan(x) & ~np.isnan(y))
+    # Matplotlib scatter (hexbin of the full data when large)
+    fig = new_figure()
+    ax = fig.subplots()
+    if large:
+        hb = ax.hexbin(x[ok], y[ok], gridsize=60, bins="log", mincnt=1)
+        fig.colorbar(hb, ax=ax, label="Count (log)")
+    else:
+        ax.scatter(x, y)
+    ax.set_title("Rating vs Price")
+    ax.set_xlabel("Rating")
+    ax.set_ylabel("Price")
+    # Trend line + confidence band for the mean
+    if trend is not None and len(ok):
+        line_x = np.linspace(x[ok].min(), x[ok].max(), 100)
+        line_y, (low, high) = trend.predict(line_x), trend.band(line_x)
+        ax.fill_between(line_x, low, high, color="C1", alpha=0.35, linewidth=0, zorder=3)
+        ax.plot(line_x, line_y, color="C1", zorder=4)
+    else:
+        trend = None
+    save(fig, outdir, "rating_vs_price_scatter.png")
+
+    # Plotly interactive: WebGL + density-preserving sample when large
+    import plotly.graph_objects as go
+    keep = ok[downsample(x[ok], y[ok], max_points)] if large else ok
+    marker = go.Scattergl if large else go.Scatter
+    title = df["title"].to_numpy()[keep] if "title" in df else None
+    fig = go.Figure(marker(x=x[keep], y=y[keep], mode="markers", name="books", text=title,
+                           hovertemplate="rating_num=%{x}<br>price=%{y}" + ("<br>title=%{text}" if title is not None else "") + "<extra></extra>"))
+    if trend is not None:
+        band = f"{trend.confidence:.0%} CI"
+        fig.add_trace(go.Scatter(x=line_x, y=high, mode="lines", line_width=0, showlegend=False, hoverinfo="skip"))
+        fig.add_trace(go.Scatter(x=line_x, y=low, mode="lines", line_width=0, fill="tonexty", name=band, hoverinfo="skip"))
+        fig.add_trace(go.Scatter(x=line_x, y=line_y, mode="lines", name="OLS trend"))
+    fig.update_layout(xaxis_title="rating_num", yaxis_title="price",
+                      title=f"Rating vs Price ({len(keep):,} of {len(ok):,} points shown)" if large else None)
     fig.write_html(os.path.join(outdir, "rating_vs_price_interactive.html"))
 
-def bars(df, outdir):
+def bars(df, outdir, **_):
     ensure_dir(outdir)
-    if "rating_num" in df:
+    if "category" in df:
+        # Enriched data (enrich_books.py) carries the real category
+        counts = df["category"].value_counts().head(20)
+        fig = new_figure(figsize=(8, 5))
+        ax = fig.subplots()
+        ax.barh(counts.index.astype(str), counts.to_numpy())
+        ax.invert_yaxis()
+        ax.set_title("Category Popularity (Top 20)")
+        ax.set_xlabel("Count")
+        ax.set_ylabel("Category")
+        fig.tight_layout()
+        save(fig, outdir, "category_popularity.png")
+    elif "rating_num" in df:
         counts = df["rating_num"].value_counts().sort_index()
-        plt.figure()
-        counts.plot(kind="bar")
-        plt.title("Category Popularity (by Rating as Proxy)")
-        plt.xlabel("Rating")
-        plt.ylabel("Count")
-        plt.savefig(os.path.join(outdir, "category_popularity.png"))
-        plt.close()
-
-def main(input_csv, out_dir):
+        fig = new_figure()
+        ax = fig.subplots()
+        ax.bar(counts.index.astype(str), counts.to_numpy())
+        ax.set_title("Category Popularity (by Rating as Proxy)")
+        ax.set_xlabel("Rating")
+        ax.set_ylabel("Count")
+        save(fig, outdir, "category_popularity.png")
+
+# Figure jobs and the columns each needs (only those are sent to a worker)
+FIGURES = [
+    (hist_box, ["price"]),
+    (scatter_trend, ["price", "rating_num", "title"]),
+    (bars, ["category", "rating_num"]),
+]
+
+def _figure_job(job):
+    figure, df, outdir, options = job
+    figure(df, outdir, **options)
+
+def render(df, out_dir, workers=None, max_points=MAX_POINTS, trend=None):
+    """Write every figure for an in-memory table, optionally across worker processes.
+
+    `trend` is a precomputed LinearFit; by default it is fitted here.
+    """
+    ensure_dir(out_dir)
+    if trend is None and {"price", "rating_num"} <= set(df.columns):
+        trend = LinearFit.from_arrays(df["rating_num"].to_numpy(dtype=float, na_value=np.nan),
+                                      df["price"].to_numpy(dtype=float, na_value=np.nan))
+    jobs = [(figure, df[[c for c in cols if c in df.columns]], out_dir,
+             {"trend": trend, "max_points": max_points} if figure is scatter_trend else {})
+            for figure, cols in FIGURES]
+    if workers and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with recorder().step("figures", rows=len(df)), ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_figure_job, jobs))
+        return
+    for job in jobs:
+        with recorder().step(job[0].__name__, rows=len(df)):
+            _figure_job(job)
+
+def load_trend(summary_path):
+    """The LinearFit cached in a stats.py analysis_summary.json, if any."""
+    with open(summary_path, encoding="utf-8") as f:
+        fit = json.load(f).get("trend_price_on_rating")
+    return LinearFit.from_dict(fit) if fit else None
+
+def main(input_csv, out_dir, workers=None, max_points=MAX_POINTS, summary_path=None):
+    from common.tables import read_table
     ensure_dir(out_dir)
-    df = pd.read_csv(input_csv)
-    hist_box(df, out_dir)
-    scatter_trend(df, out_dir)
-    bars(df, out_dir)
+    with recorder().step("read") as step:
+        df = read_table(input_csv)
+        step["rows"] = len(df)
+    render(df, out_dir, workers, max_points, load_trend(summary_path) if summary_path else None)
     print("Figures saved to", out_dir)
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True)
+    ap.add_argument("--input", required=True, help="Cleaned table (.csv, .parquet or .feather)")
     ap.add_argument("--out", default="reports/figures")
+    ap.add_argument("--workers", type=int, default=None, help="Render figures in this many processes")
+    ap.add_argument("--max-points", type=int, default=MAX_POINTS, help="Above this many rows, hexbin + sampled WebGL scatter")
+    ap.add_argument("--summary", default=None, help="Reuse the trend fit from this analysis_summary.json")
+    ap.add_argument("--profile", action="store_true", help="Write plot.pstats + plot_trace.json to --out")
     args = ap.parse_args()
-    main(args.input, args.out)
+    with profiled("plot", args.out if args.profile else None):
+        main(args.input, args.out, args.workers, args.max_points, args.summary)